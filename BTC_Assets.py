@@ -0,0 +1,83 @@
+"""
+    BTC_Assets:
+        - Heat map and golden ratio data for the other top coins of the CoinGecko markets list, next to BTC.
+        - CoinGeckoStore is a PriceStore filled from the CoinGecko market chart of one coin (daily closes) instead of
+          BCHAIN, one store directory per coin, so every coin gets the same incremental 200WMA and 350DMA.
+        - Coin histories are downloaded concurrently (threads, over the ingestor's pooled session).
+        - Indicators are updated in process, one coin after the other: a full backfill of every coin takes about 100 ms,
+          less than starting (or forking) worker processes would.
+"""
+import os
+import numpy as np
+from BTC_Price_Store import PriceStore, STORE_DIR
+from BTC_Indicators import IndicatorEngine
+from BTC_Metrics import metrics
+
+# number of top CoinGecko coins with charts, BTC (from BCHAIN) included.
+ASSET_COUNT = 10
+# directory holding one store directory per coin.
+ASSET_DIR = os.path.join(STORE_DIR, 'assets')
+
+
+class CoinGeckoStore(PriceStore):
+    def __init__(self, coin, cg, directory):
+        """Instantiating store for CoinGecko coin id coin, fetched with cg (CoinGeckoAPI), inside directory."""
+        super().__init__(coin, directory)
+        # CoinGecko client, its session and timeout are set by the ingestor.
+        self.cg = cg
+
+    def fetchRows(self, start=None):
+        """Returns daily (dates, values) newer than start (datetime64[D] or None), today's unfinished day excluded."""
+        today = np.datetime64('today', 'D')
+        days = 'max' if start is None else int((today - start).astype(np.int64)) + 1
+        with metrics.timer('fetch_prices'):
+            chart = self.cg.get_coin_market_chart_by_id(id=self.source, vs_currency='usd', days=days, interval='daily')
+        with metrics.timer('parse_prices'):
+            # prices is a list of [milliseconds, price], ascending.
+            prices = np.array(chart['prices'], dtype=np.float64).reshape(-1, 2)
+            dates = prices[:, 0].astype('datetime64[ms]').astype('datetime64[D]')
+            # last price of every day, days being sorted the last one is before the next day's first.
+            last = np.r_[dates[1:] != dates[:-1], True]
+            dates, values = dates[last], prices[last, 1]
+            keep = dates < today
+            if start is not None:
+                keep &= dates > start
+            dates, values = dates[keep], values[keep]
+        metrics.count('price_rows_fetched', len(dates))
+        return dates, values
+
+
+class AssetSet:
+    def __init__(self, cg, directory=ASSET_DIR, count=ASSET_COUNT):
+        """Instantiating empty set of coin stores under directory, for the top count coins (BTC included)."""
+        self.cg = cg
+        self.directory = directory
+        self.count = count
+        # symbol -> CoinGeckoStore and its IndicatorEngine, opened when a coin first makes the top list.
+        self.stores = {}
+        self.indicators = {}
+
+    def select(self, quotes):
+        """Returns {symbol: store} of the top coins in quotes, BTC excluded (it comes from BCHAIN)."""
+        selected = {}
+        for quote in quotes[:self.count]:
+            symbol = quote['symbol'].lower()
+            if symbol == 'btc' or symbol in selected:
+                continue
+            if symbol not in self.stores:
+                store = CoinGeckoStore(quote['id'], self.cg, os.path.join(self.directory, quote['id']))
+                self.stores[symbol] = store
+                self.indicators[symbol] = IndicatorEngine(store)
+            selected[symbol] = self.stores[symbol]
+        return selected
+
+    def update(self, symbols):
+        """Pushes the new rows of symbols through their moving averages."""
+        with metrics.timer('asset_rolling'):
+            for symbol in symbols:
+                self.indicators[symbol].update()
+
+    def read(self, symbol):
+        """Returns {column: array} of Date, Value and the indicators of symbol."""
+        dates, values = self.stores[symbol].read()
+        return {'Date': dates, 'Value': values, **self.indicators[symbol].read()}
@@ -0,0 +1,125 @@
+"""
+    BTC_Batch:
+        - Headless batch mode for cron jobs: python BTC_Batch.py --table indicators.parquet --figures charts/
+        - Runs the Bitcoin pipeline (BTC_Pipeline) and figures (BTC_Figures) only, the Dash app module with its layout,
+          callbacks and background refresher is never imported.
+        - --table writes the daily indicator table (200WMA, 4 week % change, 350DMA and multiplier bands) of the
+          selected coins, the format follows the extension: .parquet, .csv, .arrow/.feather (Arrow IPC).
+          Parquet and Arrow need pyarrow.
+        - --figures renders the heat map and golden ratio charts of every selected coin as static files
+          (png, svg, pdf need kaleido, html does not).
+        - --backtest sweeps the signal grid (BTC_Signals.GRID) over the whole history of every selected coin and writes
+          one row per coin and configuration (parameters, return, drawdown, trades), best total return first.
+        - --start/--end limit the table and charts to a date range, --shared reads the loader's shared file
+          (or the server's btc_store/snapshot.npy) instead of fetching the data.
+"""
+import os
+import argparse
+import pandas as pd
+from pycoingecko import CoinGeckoAPI
+from BTC_Assets import AssetSet, ASSET_COUNT
+from BTC_Ingest import Ingestor
+from BTC_Pipeline import Bitcoin
+from BTC_Figures import buildHeatMap, buildGoldenRatio, CHART_NAMES
+from BTC_Signals import engineFor
+
+# figure formats written with plotly's write_image (kaleido), html is written with write_html.
+IMAGE_FORMATS = ('png', 'svg', 'pdf', 'jpeg', 'webp', 'html')
+
+
+def loadCoins(symbols, shared=None):
+    """Returns {symbol: Bitcoin} of symbols ('all' for btc and every top coin), fetched or mapped from shared."""
+    everything = 'all' in symbols
+    if shared is not None:
+        btc = Bitcoin(shared=shared)
+    else:
+        # other coins are only fetched when asked for.
+        cg = CoinGeckoAPI()
+        count = ASSET_COUNT if everything or set(symbols) - {'btc'} else 1
+        btc = Bitcoin(Ingestor(cg=cg, assets=AssetSet(cg, count=count)))
+    coins = {'btc': btc, **btc.assets}
+    if everything:
+        return coins
+    missing = [symbol for symbol in symbols if symbol not in coins]
+    if missing:
+        raise SystemExit('not loaded: {} (top coins: {})'.format(', '.join(missing), ', '.join(coins)))
+    return {symbol: coins[symbol] for symbol in symbols}
+
+
+def writeTable(table, path):
+    """Writes table (data frame) to path, the format following its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if extension == '.parquet':
+        table.to_parquet(path, index=False)
+    elif extension == '.csv':
+        table.to_csv(path, index=False)
+    elif extension in ('.arrow', '.feather'):
+        table.to_feather(path)
+    else:
+        raise SystemExit('unknown table format {!r}, use .parquet, .csv, .arrow or .feather'.format(extension))
+
+
+def renderFigures(btc_obj, directory, image_format, xrange=None, width=1600, height=900):
+    """Writes the charts of btc_obj to directory as <symbol>-<chart>.<image_format>, limited to xrange if given."""
+    paths = []
+    figures = (buildHeatMap(btc_obj, xrange), buildGoldenRatio(btc_obj, xrange))
+    for name, fig in zip(CHART_NAMES, figures):
+        if xrange is not None:
+            fig.update_xaxes(range=list(xrange))
+        path = os.path.join(directory, '{}-{}.{}'.format(btc_obj.symbol, name, image_format))
+        if image_format == 'html':
+            fig.write_html(path, include_plotlyjs='cdn')
+        else:
+            fig.write_image(path, width=width, height=height)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless BTC heat map / golden ratio batch export.')
+    parser.add_argument('--assets', nargs='+', default=['btc'], help='coin symbols, or all (default btc)')
+    parser.add_argument('--table', help='indicator table file (.parquet, .csv, .arrow or .feather)')
+    parser.add_argument('--figures', help='directory the chart files are written to')
+    parser.add_argument('--format', default='png', choices=IMAGE_FORMATS, help='chart file format (default png)')
+    parser.add_argument('--backtest', help='signal sweep results file (.parquet, .csv, .arrow or .feather)')
+    parser.add_argument('--start', help='first date of the table and charts (YYYY-MM-DD)')
+    parser.add_argument('--end', help='last date of the table and charts (YYYY-MM-DD)')
+    parser.add_argument('--shared', help='read this shared/snapshot .npy file instead of fetching')
+    args = parser.parse_args(argv)
+    if args.table is None and args.figures is None and args.backtest is None:
+        parser.error('nothing to do, give --table, --figures and/or --backtest')
+    coins = loadCoins([symbol.lower() for symbol in args.assets], args.shared)
+    if args.table is not None:
+        tables = []
+        for symbol, btc_obj in coins.items():
+            table = btc_obj.indicatorTable()
+            if args.start is not None:
+                table = table[table['Date'] >= pd.Timestamp(args.start)]
+            if args.end is not None:
+                table = table[table['Date'] <= pd.Timestamp(args.end)]
+            table.insert(0, 'Symbol', symbol.upper())
+            tables.append(table)
+        writeTable(pd.concat(tables, ignore_index=True), args.table)
+        print(args.table)
+    if args.figures is not None:
+        os.makedirs(args.figures, exist_ok=True)
+        for btc_obj in coins.values():
+            xrange = None
+            if args.start is not None or args.end is not None:
+                dates = btc_obj.complete_dates
+                xrange = (args.start or str(dates.iloc[0].date()), args.end or str(dates.iloc[-1].date()))
+            for path in renderFigures(btc_obj, args.figures, args.format, xrange):
+                print(path)
+    if args.backtest is not None:
+        tables = []
+        for symbol, btc_obj in coins.items():
+            table = engineFor(btc_obj).sweep()
+            table.insert(0, 'Symbol', symbol.upper())
+            tables.append(table.sort_values('total_return', ascending=False))
+        writeTable(pd.concat(tables, ignore_index=True), args.backtest)
+        print(args.backtest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+    BTC_Benchmark:
+        - Offline benchmark of the data pipeline and chart figures: python BTC_Benchmark.py [--scales 1x 10x 100x] [--intraday]
+        - Synthetic price histories replace the live APIs, written as a local json file in the BCHAIN/Quandl layout.
+        - A scale of k puts k rows on every day of a history as long as the real BCHAIN one (DAYS days),
+          1x/10x/100x for bigger histories.
+        - Hourly (24 ticks a day) and minute (1440 ticks a day) histories are streamed through the intraday candle
+          engine (BTC_Candles) into daily bars, the charts are built from those bars with the open day overlay.
+        - A small warm up run first loads pandas/plotly internals, so the first scale is not charged for imports.
+        - For each scale it reports wall time, peak memory (tracemalloc, --no-memory for timings without its overhead)
+          and output size of every stage:
+            - parse: json fixture -> price store (daily scales).
+            - rolling: 1400/350 day moving averages over the whole history, then for 1 appended row (daily scales).
+            - candles: ticks -> daily and weekly bars, daily closes through the moving averages (intraday).
+            - resample: heat map marker buckets (BTC_Resample) over the whole history.
+            - frames: heat map / golden ratio data frames (markers already resampled).
+            - figures: building the plotly figures.
+            - json: encoding the figures (size is the encoded payload).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import tempfile
+import tracemalloc
+import numpy as np
+
+# approximate length of the real BCHAIN history in days.
+DAYS = 4500
+# rows per day of each synthetic history.
+SCALES = {'1x': 1, '10x': 10, '100x': 100}
+# ticks per day of the intraday histories.
+INTRADAY = {'hourly': 24, 'minute': 1440}
+
+
+def syntheticHistory(path, scale, days=DAYS, seed=0):
+    """Writes a random walk BTC history of days * scale rows (scale rows per day) to path, newest first like BCHAIN."""
+    rng = np.random.default_rng(seed)
+    rows = days * scale
+    dates = np.datetime64('2009-01-03') + np.arange(rows) // scale
+    # log price random walk, with the first days at 0 like the real data.
+    values = np.round(np.exp(np.cumsum(rng.normal(0.003 / scale, 0.04 / np.sqrt(scale), rows))), 2)
+    values[:300 * scale] = 0
+    data = [[str(date), float(value)] for date, value in zip(dates[::-1], values[::-1])]
+    with open(path, 'w') as f:
+        json.dump({'dataset': {'column_names': ['Date', 'Value'], 'data': data}}, f)
+
+
+def syntheticTicks(scale, days=DAYS, seed=0):
+    """Returns (times, prices) of a random walk BTC history of days * scale ticks, evenly spaced over every day."""
+    rng = np.random.default_rng(seed)
+    rows = days * scale
+    times = np.datetime64('2009-01-03', 'ns') + np.arange(rows) * np.timedelta64(86400 * 10 ** 9 // scale, 'ns')
+    prices = np.round(np.exp(np.cumsum(rng.normal(0.003 / scale, 0.04 / np.sqrt(scale), rows))), 2)
+    prices[:300 * scale] = 0
+    return times, prices
+
+
+def measure(stage, func, results, memory=True):
+    """Runs func, appends (stage, seconds, peak MB or NaN, size) to results and returns func's result."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = np.nan
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    size = sum(len(payload) for payload in result) if stage == 'json' else ''
+    results.append((stage, seconds, peak, size))
+    return result
+
+
+def chartStages(build, dates, results, memory=True):
+    """Runs the resample, frames, figures and json stages, build(resamplers) returning the Bitcoin instance of dates."""
+    from BTC_Resample import BucketResampler
+    from BTC_Figures import buildFigures
+    resampler = BucketResampler()
+    # the heat map starts after the first 1400 rows, the same dates Bitcoin resamples.
+    HM_dates = np.asarray(dates[1400:], dtype='datetime64[ns]')
+    measure('resample', lambda: resampler.update(HM_dates), results, memory)
+    # Bitcoin reuses the resampler, its frames stage only finds the markers already there.
+    btc = measure('frames', lambda: build({'btc': resampler}), results, memory)
+    figures = measure('figures', lambda: buildFigures(btc), results, memory)
+    measure('json', lambda: [fig.to_json().encode() for fig in figures], results, memory)
+    return results
+
+
+def benchmark(scale, directory, days=DAYS, memory=True):
+    """Runs every stage for a history of days * scale rows inside directory. Returns the results list."""
+    from BTC_Price_Store import PriceStore
+    from BTC_Indicators import IndicatorEngine
+    from BTC_Shared import writeShared
+    from BTC_Pipeline import Bitcoin
+    results = []
+    fixture = os.path.join(directory, 'history.json')
+    syntheticHistory(fixture, scale, days)
+    store = PriceStore(fixture, os.path.join(directory, 'store'))
+    measure('parse', store.refresh, results, memory)
+    indicators = IndicatorEngine(store)
+    measure('rolling', indicators.update, results, memory)
+    # one more row, what a daily refresh costs.
+    dates, values = store.read()
+    store.append(dates[-1:] + 1, values[-1:])
+    measure('rolling +1', indicators.update, results, memory)
+    dates, values = store.read()
+    shared = os.path.join(directory, 'shared.npy')
+    writeShared({'btc': {'Date': dates, 'Value': values, **indicators.read()}}, [], shared)
+    return chartStages(lambda resamplers: Bitcoin(shared=shared, resamplers=resamplers), dates, results, memory)
+
+
+def intradayBenchmark(scale, directory, days=DAYS, memory=True):
+    """Streams days * scale ticks through the candle engine inside directory and runs the chart stages. Returns the results list."""
+    from BTC_Price_Store import PriceStore
+    from BTC_Indicators import IndicatorEngine
+    from BTC_Candles import IntradayEngine
+    from BTC_Pipeline import Bitcoin
+    results = []
+    times, prices = syntheticTicks(scale, days)
+    engine = IntradayEngine(IndicatorEngine(PriceStore(None, os.path.join(directory, 'store'))))
+
+    def stream():
+        # batches of a month of ticks, as a feed would deliver them.
+        batch = 30 * scale
+        return sum(engine.ingest(times[k:k + batch], prices[k:k + batch]) for k in range(0, len(times), batch))
+
+    measure('candles', stream, results, memory)
+    columns = engine.columns()
+    return chartStages(lambda resamplers: Bitcoin(data=(columns, []), resamplers=resamplers, overlay=engine.overlay()),
+                       columns['Date'], results, memory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark of the BTC chart pipeline.')
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES) + list(INTRADAY), default=list(SCALES))
+    parser.add_argument('--intraday', action='store_true', help='also run hourly and minute resolution histories')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace memory (tracing slows python code down)')
+    args = parser.parse_args(argv)
+    scales = args.scales + [name for name in INTRADAY if args.intraday and name not in args.scales]
+    with tempfile.TemporaryDirectory() as directory:
+        # warm up run, not reported.
+        benchmark(1, directory, days=1500, memory=False)
+        shutil.rmtree(os.path.join(directory, 'store'))
+        print('{:<8}{:>10}{:<12}{:>10}{:>12}{:>14}'.format('scale', 'rows', '  stage', 'seconds', 'peak MB', 'bytes'))
+        for name in scales:
+            if name in SCALES:
+                scale, run = SCALES[name], benchmark
+            else:
+                scale, run = INTRADAY[name], intradayBenchmark
+            for stage, seconds, peak, size in run(scale, directory, memory=not args.no_memory):
+                print('{:<8}{:>10}  {:<10}{:>10.3f}{:>12.1f}{:>14}'.format(name, DAYS * scale, stage, seconds, peak, size))
+            sys.stdout.flush()
+            # next scale starts from an empty store.
+            shutil.rmtree(os.path.join(directory, 'store'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+    BTC_Candles:
+        - Intraday (hourly, minute, tick) BTC prices streamed into daily and weekly OHLC bars.
+        - CandleAggregator only keeps the bar that is still open, every batch of ticks is folded into it with numpy
+          (reduceat over the period boundaries), completed bars are handed back and the raw ticks are dropped.
+        - IntradayEngine appends every completed daily bar (its close) to a PriceStore and pushes it through the
+          IndicatorEngine, so the 200WMA heat map and 350DMA multipliers are computed on daily bars exactly like the
+          BCHAIN daily closes. Weekly closes feed a true 200 week moving average.
+        - overlay() gives provisional values for the open day (price and moving averages as if the day closed now)
+          without touching the stored state. Bitcoin(data=(engine.columns(), quotes), overlay=engine.overlay())
+          builds the charts from the daily bars with the open day drawn on them.
+        - Daily closes are appended to the store first, then the open bars, weekly closes and weekly moving average
+          are saved together in one atomic file. Days and weeks already committed are skipped, so replaying ticks
+          after a crash in between never counts a day or a week twice.
+        - The Dash app still charts the BCHAIN daily closes, there is no intraday price feed wired to it.
+"""
+import os
+import copy
+import json
+import math
+import numpy as np
+from BTC_Indicators import RollingMean
+
+# bar columns, Date is the start of the bar's period.
+BAR_DTYPE = [('Date', 'datetime64[ns]'), ('Open', np.float64), ('High', np.float64),
+             ('Low', np.float64), ('Close', np.float64), ('Volume', np.float64)]
+# 1970-01-01 is a Thursday, weekly bars start on Mondays (4 days later).
+WEEK_OFFSET = 4
+
+
+class CandleAggregator:
+    def __init__(self, period='D'):
+        """Instantiating aggregator of 'D' (daily) or 'W' (weekly, starting Monday) bars."""
+        if period not in ('D', 'W'):
+            raise ValueError('period must be D or W, not {!r}'.format(period))
+        self.period = period
+        # bar still open (a 0-d BAR_DTYPE record) and its period number, None before the first tick.
+        self.bar = None
+        self.bucket = None
+        # ticks older than the open bar, they can not be applied any more.
+        self.late = 0
+
+    def buckets(self, times):
+        """Returns period number of every time (days or weeks since the epoch)."""
+        days = times.astype('datetime64[D]').astype(np.int64)
+        if self.period == 'D':
+            return days
+        return (days - WEEK_OFFSET) // 7
+
+    def start(self, bucket):
+        """Returns start of period number bucket as datetime64[ns]."""
+        days = bucket if self.period == 'D' else bucket * 7 + WEEK_OFFSET
+        return np.datetime64(int(days), 'D').astype('datetime64[ns]')
+
+    def ingest(self, times, prices, volumes=None):
+        """
+            Folds ticks (or candles, using their close) into the open bar. Ticks are sorted by time first.
+            Returns a BAR_DTYPE array of the bars completed by this batch (may be empty).
+        """
+        times = np.asarray(times, dtype='datetime64[ns]')
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.zeros(len(prices)) if volumes is None else np.asarray(volumes, dtype=np.float64)
+        order = np.argsort(times, kind='stable')
+        times, prices, volumes = times[order], prices[order], volumes[order]
+        buckets = self.buckets(times)
+        if self.bucket is not None:
+            keep = buckets >= self.bucket
+            self.late += int(len(keep) - keep.sum())
+            times, prices, volumes, buckets = times[keep], prices[keep], volumes[keep], buckets[keep]
+        if len(prices) == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        # first tick of every period in the batch.
+        firsts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        lasts = np.r_[firsts[1:] - 1, len(prices) - 1]
+        bars = np.empty(len(firsts), dtype=BAR_DTYPE)
+        bars['Date'] = [self.start(bucket) for bucket in buckets[firsts]]
+        bars['Open'] = prices[firsts]
+        bars['High'] = np.maximum.reduceat(prices, firsts)
+        bars['Low'] = np.minimum.reduceat(prices, firsts)
+        bars['Close'] = prices[lasts]
+        bars['Volume'] = np.add.reduceat(volumes, firsts)
+        completed = []
+        if self.bar is not None:
+            if buckets[0] == self.bucket:
+                # batch continues the open bar.
+                bars['Open'][0] = self.bar['Open']
+                bars['High'][0] = max(bars['High'][0], self.bar['High'])
+                bars['Low'][0] = min(bars['Low'][0], self.bar['Low'])
+                bars['Volume'][0] += self.bar['Volume']
+            else:
+                completed.append(self.bar.reshape(1))
+        completed.append(bars[:-1])
+        # kept as a 0-d array, the same type fromState() restores.
+        self.bar = np.array(bars[-1])
+        self.bucket = int(buckets[-1])
+        return np.concatenate(completed)
+
+    def state(self):
+        """Returns open bar as a json serializable dict."""
+        bar = None
+        if self.bar is not None:
+            bar = {name: self.bar[name].item() for name in self.bar.dtype.names if name != 'Date'}
+        return {'period': self.period, 'bucket': self.bucket, 'bar': bar, 'late': self.late}
+
+    @classmethod
+    def fromState(cls, state):
+        """Returns a CandleAggregator restored from state()."""
+        obj = cls(state['period'])
+        obj.late = state['late']
+        if state['bar'] is not None:
+            obj.bucket = state['bucket']
+            obj.bar = np.zeros((), dtype=BAR_DTYPE)
+            obj.bar['Date'] = obj.start(obj.bucket)
+            for name, value in state['bar'].items():
+                obj.bar[name] = value
+        return obj
+
+
+class IntradayEngine:
+    def __init__(self, indicators, weeks=200):
+        """
+            Instantiating engine committing daily bars to the PriceStore of indicators (an IndicatorEngine).
+            weeks is the window of the weekly close moving average.
+        """
+        # store and indicator engine the completed daily closes go to.
+        self.indicators = indicators
+        self.store = indicators.store
+        # json file holding open bars and weekly state.
+        self.path = os.path.join(self.store.directory, 'intraday.json')
+        self.daily = CandleAggregator('D')
+        self.weekly = CandleAggregator('W')
+        # moving average of weekly closes and its values so far, [[week start, close, average], ...].
+        self.weekly_mean = RollingMean(weeks)
+        self.weeks = []
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            self.daily = CandleAggregator.fromState(state['daily'])
+            self.weekly = CandleAggregator.fromState(state['weekly'])
+            self.weekly_mean = RollingMean.fromState(state['weekly_mean'])
+            self.weeks = state['weeks']
+
+    def ingest(self, times, prices, volumes=None):
+        """Streams a batch of ticks/candles in. Returns number of daily bars committed to the store."""
+        days = self.daily.ingest(times, prices, volumes)
+        weeks = self.weekly.ingest(times, prices, volumes)
+        last = self.store.lastDate()
+        dates = days['Date'].astype('datetime64[D]')
+        # days already in the store (e.g. after a restart) are not appended twice.
+        if last is not None:
+            days, dates = days[dates > last], dates[dates > last]
+        if len(days):
+            self.store.append(dates, days['Close'])
+            self.indicators.update()
+        # weeks already pushed (ticks replayed after a restart) are skipped.
+        if self.weeks:
+            weeks = weeks[weeks['Date'].astype('datetime64[D]') > np.datetime64(self.weeks[-1][0])]
+        for week in weeks:
+            close = float(week['Close'])
+            self.weeks.append([str(week['Date'].astype('datetime64[D]')), close, self.weekly_mean.push(close)])
+        # open bars and the weekly pushes are saved together, in one atomic replace.
+        self.save()
+        return len(days)
+
+    def columns(self):
+        """Returns {column: array} of Date, Value (daily closes) and the indicators, the layout Bitcoin builds from."""
+        dates, values = self.store.read()
+        return {'Date': dates, 'Value': values, **self.indicators.read()}
+
+    def save(self):
+        """Writes open bars and weekly state, replacing the file atomically."""
+        state = {'daily': self.daily.state(), 'weekly': self.weekly.state(),
+                 'weekly_mean': self.weekly_mean.state(), 'weeks': self.weeks}
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def overlay(self):
+        """
+            Returns provisional values of the open day as a dict (Date, Open, High, Low, Close, 200WMA, 350DMA, 200W),
+            the moving averages being computed as if the day closed at the last price. None before the first tick.
+        """
+        bar = self.daily.bar
+        if bar is None:
+            return None
+        close = float(bar['Close'])
+        means = self.indicators.means
+        # pushing into copies, the stored window state is left untouched.
+        overlay = {name: bar[name].item() for name in bar.dtype.names if name != 'Date'}
+        overlay['Date'] = bar['Date'][()]
+        overlay['200WMA'] = copy.deepcopy(means['200WMA']).push(close)
+        overlay['350DMA'] = copy.deepcopy(means['350DMA']).push(close) if close > 0 else math.nan
+        overlay['200W'] = copy.deepcopy(self.weekly_mean).push(close)
+        return overlay
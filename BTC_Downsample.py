@@ -0,0 +1,71 @@
+"""
+    BTC_Downsample:
+        - Reduces daily price and moving average lines to what a chart can actually draw before they are sent to the browser.
+        - Min/max decimation: the visible points are split into equal buckets (about one per pixel column) and only the
+          first, lowest, highest and last point of every bucket are kept, so peaks and drops are never lost.
+        - Everything is vectorized with numpy (reduceat), no python loop over points.
+        - When a chart is zoomed (relayoutData x range) only the points inside the range are decimated,
+          so zooming in gives back full resolution for the visible window.
+          Only x range changes and resets are answered, other relayouts (autosize, y only zoom, dragmode) send nothing.
+"""
+import numpy as np
+import pandas as pd
+
+# number of points a line is reduced to, roughly the pixel width of a wide chart.
+POINTS = 2000
+
+
+def zoomRange(relayoutData, axis='xaxis'):
+    """Returns (start, end) of the zoomed axis range in relayoutData, None if the chart is not zoomed."""
+    if not relayoutData:
+        return None
+    if axis + '.range[0]' in relayoutData and axis + '.range[1]' in relayoutData:
+        return relayoutData[axis + '.range[0]'], relayoutData[axis + '.range[1]']
+    if axis + '.range' in relayoutData:
+        return tuple(relayoutData[axis + '.range'])
+    return None
+
+
+def zoomReset(relayoutData, axis='xaxis'):
+    """Returns True if relayoutData resets the axis to its full range (double click, autoscale or reset axes)."""
+    return bool(relayoutData) and bool(relayoutData.get(axis + '.autorange'))
+
+
+def windowIndices(x, xrange=None):
+    """Returns (lo, hi) positions of x (ascending datetimes) inside xrange, plus one point on each side."""
+    if xrange is None:
+        return 0, len(x)
+    x = np.asarray(x, dtype='datetime64[ns]')
+    start, end = (pd.Timestamp(bound).to_datetime64() for bound in xrange)
+    # keeping one point beyond each edge so lines run to the border of the chart.
+    lo = max(np.searchsorted(x, start, side='left') - 1, 0)
+    hi = min(np.searchsorted(x, end, side='right') + 1, len(x))
+    return lo, hi
+
+
+def minMaxIndices(y, points=POINTS):
+    """Returns sorted positions of y keeping first, min, max and last value of points // 4 equal buckets."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    buckets = max(points // 4, 1)
+    if n <= points:
+        return np.arange(n)
+    # bucket boundaries and the bucket each position belongs to.
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(buckets), np.diff(np.append(edges, n)))
+    # fmin/fmax ignore NaN unless a whole bucket is NaN.
+    lows = np.fmin.reduceat(y, edges)
+    highs = np.fmax.reduceat(y, edges)
+    # first position in every bucket matching the bucket min/max.
+    low = np.flatnonzero(y == lows[bucket])
+    low = low[np.unique(bucket[low], return_index=True)[1]]
+    high = np.flatnonzero(y == highs[bucket])
+    high = high[np.unique(bucket[high], return_index=True)[1]]
+    last = np.append(edges[1:] - 1, n - 1)
+    return np.unique(np.concatenate((edges, low, high, last)))
+
+
+def decimate(x, y, xrange=None, points=POINTS):
+    """Returns positions of the points of (x, y) to plot for xrange (whole series if None)."""
+    lo, hi = windowIndices(x, xrange)
+    return lo + minMaxIndices(np.asarray(y)[lo:hi], points)
@@ -0,0 +1,59 @@
+"""
+    BTC_Figure_Cache:
+        - Builds the chart figures once per data version instead of on every page load.
+        - Figures are validated and serialized by plotly a single time, the cache keeps the encoded json bytes
+          and the plain dicts decoded from them (dash returns the dicts without building a go.Figure again).
+        - With pack (BTC_Render.packFigure in webgl mode) the cached dicts are the packed figures instead.
+        - One entry per coin (snapshot.symbol), a new entry replaces the old one of that coin when a snapshot with a
+          different version is requested.
+"""
+import json
+import time
+import threading
+from BTC_Metrics import metrics
+
+
+class FigureCache:
+    def __init__(self, build, pack=None):
+        """
+            Instantiating empty cache for build (callable taking a snapshot, returning a list of go.Figure).
+            pack (callable taking a go.Figure, returning a json serializable dict) replaces plotly's own encoding.
+        """
+        # callable building the figures of a snapshot.
+        self.build = build
+        self.pack = pack
+        # symbol -> (version, figure dicts, figure json bytes, time built) of the last built snapshot of that coin.
+        self.entries = {}
+        # only one thread builds a version, the others wait and reuse it.
+        self.lock = threading.Lock()
+
+    def load(self, snapshot):
+        """Returns the cache entry for snapshot, building it if the cached version is different."""
+        entry = self.entries.get(snapshot.symbol)
+        if entry is None or entry[0] != snapshot.version:
+            with self.lock:
+                entry = self.entries.get(snapshot.symbol)
+                if entry is None or entry[0] != snapshot.version:
+                    metrics.count('figure_cache', result='miss')
+                    with metrics.timer('figures'):
+                        figures = self.build(snapshot)
+                    with metrics.timer('figure_json'):
+                        if self.pack is not None:
+                            dicts = [self.pack(fig) for fig in figures]
+                            payloads = [json.dumps(figure).encode() for figure in dicts]
+                        else:
+                            payloads = [fig.to_json().encode() for fig in figures]
+                            dicts = [json.loads(payload) for payload in payloads]
+                        entry = (snapshot.version, dicts, payloads, time.time())
+                    self.entries[snapshot.symbol] = entry
+                    return entry
+        metrics.count('figure_cache', result='hit')
+        return entry
+
+    def figures(self, snapshot):
+        """Returns the figures of snapshot as plain dicts."""
+        return self.load(snapshot)[1]
+
+    def payloads(self, snapshot):
+        """Returns the figures of snapshot as encoded json bytes."""
+        return self.load(snapshot)[2]
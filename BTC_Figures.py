@@ -0,0 +1,224 @@
+"""
+    BTC_Figures:
+        - Plotly figures of the 200WMA Heat Map and Golden Ratio charts for a Bitcoin instance (BTC_Pipeline), no Dash code.
+        - Lines are decimated to what a chart can draw (BTC_Downsample), traces follow the render mode (BTC_Render).
+        - A Bitcoin instance built from intraday bars (overlay given) also gets the open day drawn on both charts.
+"""
+import numpy as np
+import plotly.graph_objs as go
+from BTC_Downsample import decimate, windowIndices
+from BTC_Render import Scatter, xValues
+
+
+"""
+    buildFigures(btc_obj):
+        - Builds the heat map and golden ratio figures of a Bitcoin snapshot.
+        - Called once per data version through figure_cache.
+"""
+def buildFigures(btc_obj):
+    return buildHeatMap(btc_obj), buildGoldenRatio(btc_obj)
+"""
+    buildHeatMap(btc_obj, xrange):
+        - Builds the heat map figure, lines are decimated to the points visible in xrange (whole history if None).
+"""
+def buildHeatMap(btc_obj, xrange=None):
+    # Heat map figure which will hold all plots significant to the 200WMA Heat Map.
+    HMfig = go.Figure()
+    # positions of the points to plot for each line.
+    WMA_idx = decimate(btc_obj.HM_dates, btc_obj.HM_daily_df['200WMA'], xrange)
+    price_idx = decimate(btc_obj.HM_dates, btc_obj.HM_daily_df['Value'], xrange)
+    # monthly markers are few, only trimmed to the zoomed range.
+    lo, hi = windowIndices(btc_obj.HM_monthly_dates, xrange)
+    # Heat Map BTC 200WMA line.
+    HMfig.add_trace(
+        Scatter(
+            x=xValues(btc_obj.HM_dates.iloc[WMA_idx]),
+            y=btc_obj.HM_daily_df['200WMA'].iloc[WMA_idx],
+            mode='lines',
+            legendrank=2,
+            line={'color':'rgb(227, 9, 9)'},
+            name='200WMA',
+        )
+    )
+    # Heat Map BTC Daily price chart.
+    HMfig.add_trace(
+        Scatter(
+            x=xValues(btc_obj.HM_dates.iloc[price_idx]),
+            y=btc_obj.HM_daily_df['Value'].iloc[price_idx],
+            mode='lines',
+            legendrank=1,
+            line={'color':'rgb(0, 89, 255)'},
+            showlegend=False,
+        )
+    )
+    # heat map markers
+    HMfig.add_trace(Scatter(x=xValues(btc_obj.HM_monthly_dates.iloc[lo:hi]),
+                               y=btc_obj.HM_monthly_df['Value'].iloc[lo:hi],
+                               marker={'color':btc_obj.HM_distance.iloc[lo:hi],
+                                       'colorscale':'rainbow',
+                                       'cmin':0,
+                                       'cmax':20,
+                                       'size':8,
+                                       },
+                               mode='markers',
+                               showlegend=False,
+                               )
+                    )
+    # open intraday day, if any.
+    if btc_obj.overlay is not None:
+        HMfig.add_trace(overlayTrace(btc_obj.overlay, '200WMA'))
+    HMfig.update_yaxes(type='log')
+    # keeping the user's zoom when the figure is replaced with a higher resolution one.
+    HMfig.update_layout(uirevision='heatmap')
+    return HMfig
+"""
+    buildGoldenRatio(btc_obj, xrange):
+        - Builds the golden ratio figure, lines are decimated to the points visible in xrange (whole history if None).
+"""
+def buildGoldenRatio(btc_obj, xrange=None):
+    # Golden ration figure which will hold all plots significant to the Golden ration multiplier.
+    GRfig = go.Figure()
+    # multipliers are the 350DMA scaled by a constant, so they share its min/max positions.
+    DMA_idx = decimate(btc_obj.GR_dates, btc_obj.GR_daily_df['350DMA'], xrange)
+    price_idx = decimate(btc_obj.GR_dates, btc_obj.GR_daily_df['Value'], xrange)
+    # multiplier bands for the plotted 350DMA points, one column per multiplier.
+    bands = btc_obj.goldenRatioBands(DMA_idx)
+    # the 350DMA and every band share one x array.
+    DMA_x = xValues(btc_obj.GR_dates.iloc[DMA_idx])
+    # 350 day moving average
+    GRfig.add_trace(
+        Scatter(
+            x=DMA_x,
+            y=btc_obj.GR_daily_df['350DMA'].iloc[DMA_idx],
+            mode='lines',
+            legendrank=2,
+            line={'color': 'rgb(255, 204, 0)'},
+            name='350DMA',
+        ),
+    )
+    # Golden Ratio Multiplier(GRM): 1.6
+    GRfig.add_trace(
+        Scatter(
+            x=DMA_x,
+            y=bands[:, 0],
+            mode='lines',
+            legendrank=3,
+            line={'color': 'rgb(0, 201, 54)'},
+            name='1.6 GRM',
+            opacity=0.4,
+        )
+    )
+    # Golden Ratio Multiplier(GRM): 2.0
+    GRfig.add_trace(
+        Scatter(
+            x=DMA_x,
+            y=bands[:, 1],
+            mode='lines',
+            legendrank=3,
+            line={'color': 'rgb(245, 0, 82)'},
+            name='2 GRM',
+            opacity=0.4,
+        )
+    )
+    # Golden Ratio Multiplier(GRM): 3.0
+    GRfig.add_trace(
+        Scatter(
+            x=DMA_x,
+            y=bands[:, 2],
+            mode='lines',
+            legendrank=4,
+            line={'color': 'rgb(219, 15, 206)'},
+            name='3 GRM',
+            opacity=0.4,
+        )
+    )
+    # Golden Ratio Multiplier(GRM): 5.0
+    GRfig.add_trace(
+        Scatter(
+            x=DMA_x,
+            y=bands[:, 3],
+            mode='lines',
+            legendrank=4,
+            line={'color': 'rgb(73, 0, 122)'},
+            name='5 GRM',
+            opacity=0.4,
+        )
+    )
+    # Golden Ratio Multiplier(GRM): 8.0
+    GRfig.add_trace(
+        Scatter(
+            x=DMA_x,
+            y=bands[:, 4],
+            mode='lines',
+            legendrank=4,
+            opacity=0.4,
+            line={'color': 'rgb(11, 1, 97)',
+                  'dash':'dash'
+                  },
+            name='8 GRM',
+        )
+    )
+    # Golden Ratio Multiplier(GRM): 13.0
+    GRfig.add_trace(
+        Scatter(
+            x=DMA_x,
+            y=bands[:, 5],
+            mode='lines',
+            legendrank=4,
+            opacity=0.4,
+            line={'color': 'rgb(11, 1, 97)',
+                  'dash': 'dash'
+                  },
+            name='13 GRM',
+        )
+    )
+    # Golden Ratio Multiplier(GRM): 21.0
+    GRfig.add_trace(
+        Scatter(
+            x=DMA_x,
+            y=bands[:, 6],
+            mode='lines',
+            legendrank=4,
+            opacity=0.4,
+            line={'color': 'rgb(11, 1, 97)',
+                  'dash': 'dash'
+                  },
+            name='21 GRM',
+        )
+    )
+    # BTC Daily price chart.
+    GRfig.add_trace(
+        Scatter(
+            x=xValues(btc_obj.GR_dates.iloc[price_idx]),
+            y=btc_obj.GR_daily_df['Value'].iloc[price_idx],
+            mode='lines',
+            legendrank=1,
+            line={'color': 'rgb(0, 89, 255)'},
+            name='BTC Price',
+        )
+    )
+    # open intraday day, if any.
+    if btc_obj.overlay is not None:
+        GRfig.add_trace(overlayTrace(btc_obj.overlay, '350DMA'))
+    GRfig.update_yaxes(type='log',
+                       title='Price'
+                       )
+    GRfig.update_xaxes(title='Date')
+    GRfig.update_layout(uirevision='golden')
+    return GRfig
+# names of the charts in buildFigures order, used in /charts urls and exported file names.
+CHART_NAMES = ('heatmap', 'golden')
+"""
+    overlayTrace(overlay, line):
+        - Returns the markers of the open intraday day: its last price and the line (200WMA or 350DMA) as if the day closed now.
+"""
+def overlayTrace(overlay, line):
+    date = np.datetime64(overlay['Date'], 'ns')
+    return Scatter(
+        x=xValues(np.array([date, date])),
+        y=[overlay['Close'], overlay[line]],
+        text=['Price (open day)', line + ' (open day)'],
+        mode='markers',
+        marker={'symbol': 'diamond-open', 'size': 10, 'color': 'rgb(0, 0, 0)'},
+        name='Open day',
+    )
@@ -0,0 +1,132 @@
+"""
+    BTC_Http:
+        - HTTP caching for the chart figures of the dash server, bandwidth and CPU stay flat as viewers are added.
+        - GET /charts/<symbol>/<chart>.json serves the cached figure json of the latest data version with a data
+          version ETag, Last-Modified and Cache-Control, for a CDN or kiosks polling the charts. A request sending
+          the ETag back in If-None-Match (or a matching If-Modified-Since) is answered 304 Not Modified without a body.
+        - The figure json is compressed with brotli or gzip (whichever the client accepts) once per (symbol, data
+          version, chart, render mode), the compressed bytes are kept in a small cache and reused for every viewer.
+          flask-compress (enabled by dash) leaves responses that already have a Content-Encoding alone.
+        - Dash callback responses (POST, never conditional) are left to flask-compress.
+        - exportFigures writes the figures and their .gz/.br copies to a directory for static (CDN) serving,
+          the server exports after every refresh if BTC_EXPORT_DIR is set.
+"""
+import os
+import gzip
+import threading
+from collections import OrderedDict
+from BTC_Metrics import metrics
+from BTC_Render import RENDER_MODE
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# number of compressed responses kept (least recently used are dropped).
+CACHE_SIZE = 32
+# compression levels, spent once per data version.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+# seconds a CDN or browser may reuse /charts responses without asking again.
+MAX_AGE = 60
+# directory the latest figures are exported to after every refresh, no export if not set.
+EXPORT_DIR = os.environ.get('BTC_EXPORT_DIR')
+
+
+def compress(data, encoding):
+    """Returns data (bytes) compressed with encoding ('br' or 'gzip')."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL)
+
+
+class CompressedCache:
+    def __init__(self, size=CACHE_SIZE):
+        """Instantiating empty cache of size compressed bodies."""
+        self.size = size
+        # (key, encoding) -> compressed bytes, oldest first.
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, data, encoding):
+        """Returns data compressed with encoding, compressing it only if key was not seen with encoding before."""
+        with self.lock:
+            compressed = self.entries.get((key, encoding))
+            if compressed is not None:
+                self.entries.move_to_end((key, encoding))
+                metrics.count('http_compress', result='hit')
+                return compressed
+        metrics.count('http_compress', result='miss')
+        with metrics.timer('compress'):
+            compressed = compress(data, encoding)
+        with self.lock:
+            self.entries[(key, encoding)] = compressed
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return compressed
+
+
+def acceptedEncoding(request):
+    """Returns 'br' or 'gzip' if the client accepts it (brotli preferred), None otherwise."""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def cachedResponse(response, request, cache, etag):
+    """Tags response (a full 200 response) with etag, turns it into a 304 or a pre-compressed response (compressed once per etag)."""
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    if request.if_none_match.contains_weak(etag):
+        metrics.count('http_not_modified')
+        response.status_code = 304
+        response.set_data(b'')
+        return response
+    encoding = acceptedEncoding(request)
+    if encoding is not None:
+        response.set_data(cache.get(etag, response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def registerHttpCache(server, charts):
+    """
+        Adds the /charts routes to server, with ETags, 304 responses and cached compression.
+        charts(symbol) returns (version, time built, {chart name: figure json bytes}) of the latest figures of symbol.
+    """
+    from flask import Response, request, abort
+    cache = CompressedCache()
+
+    @server.route('/charts/<symbol>/<name>.json')
+    def chartRoute(symbol, name):
+        latest = charts(symbol)
+        if latest is None or name not in latest[2]:
+            abort(404)
+        version, built, payloads = latest
+        response = Response(payloads[name], mimetype='application/json')
+        response.last_modified = built
+        response.cache_control.public = True
+        response.cache_control.max_age = MAX_AGE
+        if request.if_modified_since is not None and not request.if_none_match:
+            if int(built) <= request.if_modified_since.timestamp():
+                response.status_code = 304
+                response.set_data(b'')
+                return response
+        # packed (webgl) and plain figures of the same version are different responses.
+        return cachedResponse(response, request, cache, '{}-{}-{}-{}'.format(symbol, version, name, RENDER_MODE))
+
+
+def exportFigures(directory, charts):
+    """Writes charts ({file name: json bytes}) to directory with .gz and .br copies, replacing each file atomically."""
+    os.makedirs(directory, exist_ok=True)
+    for name, data in charts.items():
+        files = {name: data, name + '.gz': compress(data, 'gzip')}
+        if brotli is not None:
+            files[name + '.br'] = compress(data, 'br')
+        for file, content in files.items():
+            path = os.path.join(directory, file)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(content)
+            os.replace(path + '.tmp', path)
@@ -0,0 +1,171 @@
+"""
+    BTC_Indicators:
+        - Incremental moving averages for the 200WMA Heat Map (1400 day) and Golden Ratio (350 day) charts.
+        - Each appended daily price updates a running window sum in constant time instead of re-running
+          rolling(window).mean() over all of history.
+        - RollingMean uses the same compensated (Kahan) add/remove arithmetic as pandas rolling().mean(),
+          so the values are bit for bit identical to the pandas output.
+        - IndicatorEngine keeps the window state and the computed columns next to the price store between runs,
+          restoring and updating them under the store's lock (PriceStore.locked) since several processes share them.
+"""
+import os
+import json
+import math
+import numpy as np
+from BTC_Metrics import metrics
+
+
+class RollingMean:
+    def __init__(self, window):
+        """Instantiating an empty window of window values."""
+        # number of values in the window.
+        self.window = window
+        # ring buffer holding the last window values, head points at the oldest one once full.
+        self.buffer = []
+        self.head = 0
+        # running state, mirrors pandas' roll_mean.
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.neg_ct = 0
+        self.num_consecutive_same_value = 0
+        self.prev_value = math.nan
+
+    def add(self, val):
+        """Adds val to the running sum (pandas add_mean)."""
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct += 1
+            # counting repeated values to return them exactly, without floating point artifacts.
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+
+    def remove(self, val):
+        """Removes val from the running sum (pandas remove_mean)."""
+        if val == val:
+            self.nobs -= 1
+            y = - val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct -= 1
+
+    def mean(self):
+        """Returns mean of the current window, NaN until window values have been observed (pandas calc_mean)."""
+        if self.nobs >= self.window and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.num_consecutive_same_value >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            return result
+        return math.nan
+
+    def push(self, val):
+        """Appends one value to the window and returns the new mean."""
+        val = float(val)
+        # pandas treats infinite values as missing.
+        if math.isinf(val):
+            val = math.nan
+        if len(self.buffer) == self.window:
+            # dropping the oldest value before adding the new one, in the same order pandas does.
+            old = self.buffer[self.head]
+            self.buffer[self.head] = val
+            self.head = (self.head + 1) % self.window
+            self.remove(old)
+        else:
+            self.buffer.append(val)
+        self.add(val)
+        return self.mean()
+
+    def state(self):
+        """Returns window state as a json serializable dict."""
+        return dict(self.__dict__)
+
+    @classmethod
+    def fromState(cls, state):
+        """Returns a RollingMean restored from state()."""
+        obj = cls(state['window'])
+        obj.__dict__.update(state)
+        return obj
+
+
+class IndicatorEngine:
+    # indicator column -> window length in days.
+    windows = {'200WMA': 1400, '350DMA': 350}
+
+    def __init__(self, store):
+        """Instantiating engine for a PriceStore, restoring saved window state if there is any."""
+        # price store the indicators are computed from, indicator columns are kept in the same directory.
+        self.store = store
+        # json file holding window state and number of price rows already consumed.
+        self.path = os.path.join(store.directory, 'indicators.json')
+        with self.store.locked():
+            self.load()
+
+    def load(self):
+        """Restores saved window state and drops indicator rows written after it, called with the store locked."""
+        self.reset()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            self.rows = state['rows']
+            self.means = {column: RollingMean.fromState(state['means'][column]) for column in self.windows}
+        # only rows left by an update interrupted before saving its state, the lock keeps out updates in progress.
+        for column in self.windows:
+            with open(self.store.path(column), 'ab') as f:
+                f.truncate(self.rows * 8)
+
+    def reset(self):
+        """Clears window state, indicators are recomputed from the first price row on the next update."""
+        self.rows = 0
+        self.means = {column: RollingMean(window) for column, window in self.windows.items()}
+
+    def update(self):
+        """Pushes price rows added to the store since the last update through every window. Returns rows added."""
+        with self.store.locked():
+            # another process may have updated since this engine loaded, continuing from the saved state.
+            self.load()
+            return self.push()
+
+    def push(self):
+        """Pushes the new price rows and saves the state, called with the store locked. Returns rows added."""
+        dates, values = self.store.read()
+        # store was rebuilt from scratch, starting over.
+        if len(values) < self.rows:
+            self.reset()
+        new = np.asarray(values[self.rows:])
+        if len(new) == 0:
+            return 0
+        with metrics.timer('rolling'):
+            # 200WMA uses every daily price.
+            wma = [self.means['200WMA'].push(val) for val in new]
+            # 350DMA only uses days with a price above 0, other days are left as NaN.
+            dma = [self.means['350DMA'].push(val) if val > 0 else math.nan for val in new]
+            for column, col in (('200WMA', wma), ('350DMA', dma)):
+                with open(self.store.path(column), 'ab') as f:
+                    f.truncate(self.rows * 8)
+                    f.write(np.asarray(col, dtype=np.float64).tobytes())
+            self.rows += len(new)
+            # state is written to a temporary file first so it is replaced atomically.
+            state = {'rows': self.rows, 'means': {column: mean.state() for column, mean in self.means.items()}}
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(state, f)
+            os.replace(self.path + '.tmp', self.path)
+        return len(new)
+
+    def read(self):
+        """Returns {column: array} of every indicator, aligned with the price store rows."""
+        return {column: self.store.readColumn(column, self.rows) for column in self.windows}
@@ -0,0 +1,122 @@
+"""
+    BTC_Ingest:
+        - Fetches the BCHAIN price history and the CoinGecko top coin quotes at the same time (thread pool),
+          a refresh takes as long as the slowest source instead of the sum of both.
+        - Both sources share one pooled keep-alive requests session, retried with exponential backoff on
+          connection errors and 429/5xx responses, and every request has a per source timeout so a hung upstream
+          can not freeze the process.
+        - Each source falls back on its own to cached data: the prices already in the local store, or the last
+          quotes that were fetched. A refresh only fails if there is no price history at all.
+        - The other top coins of the quotes (BTC_Assets) are downloaded in the same pool as soon as the quotes are in,
+          load() returns the columns of every coin by symbol.
+        - Source urls are attributes (store.source, cg.api_base_url), so it can run against a local stub HTTP server.
+"""
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pycoingecko import CoinGeckoAPI
+from BTC_Price_Store import PriceStore, API_URL
+from BTC_Indicators import IndicatorEngine
+from BTC_Assets import AssetSet
+from BTC_Metrics import metrics
+
+# seconds before a request to each source is given up (per attempt).
+TIMEOUTS = {'prices': 30, 'quotes': 10}
+# attempts after the first one, waiting backoff_factor * 2 ** attempt seconds in between.
+RETRIES = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+
+
+def pooledSession(size, retries=RETRIES):
+    """Returns a requests session keeping up to size connections per host alive between refreshes, retrying failed requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class Ingestor:
+    def __init__(self, store=None, cg=None, quotes=None, timeouts=TIMEOUTS, assets=None):
+        """
+            Instantiating ingestor for a PriceStore and a CoinGeckoAPI (defaults to the BCHAIN url and coingecko.com).
+            quotes are the CoinGecko markets to fall back on until the first successful fetch.
+            assets is the AssetSet of the other coins (defaults to the top ASSET_COUNT coins of the quotes).
+        """
+        # CoinGecko client and the price stores of the other top coins.
+        self.cg = cg if cg is not None else CoinGeckoAPI()
+        self.assets = assets if assets is not None else AssetSet(self.cg)
+        # one thread per source, and one pooled connection per thread (the coin histories all go to CoinGecko at once).
+        workers = 2 + self.assets.count
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='btc-ingest')
+        # pooled session shared by every source.
+        self.session = pooledSession(workers)
+        # BCHAIN price history store.
+        self.store = store if store is not None else PriceStore(API_URL)
+        self.store.session = self.session
+        self.store.timeout = timeouts['prices']
+        # 200WMA and 350DMA of the stored prices.
+        self.indicators = IndicatorEngine(self.store)
+        # CoinGecko client using the pooled session instead of its own.
+        self.cg.session = self.session
+        self.cg.request_timeout = timeouts['quotes']
+        # last good CoinGecko markets.
+        self.quotes = quotes if quotes is not None else []
+
+    def fetchPrices(self):
+        """Appends new days to the store. Returns False (stored history is used) if the source failed."""
+        try:
+            self.store.refresh()
+            return True
+        except Exception:
+            traceback.print_exc()
+            metrics.count('fetch_errors', source='prices')
+            return False
+
+    def fetchQuotes(self):
+        """Returns the top coin markets, the last good ones if the source failed."""
+        try:
+            with metrics.timer('fetch_quotes'):
+                self.quotes = self.cg.get_coins_markets(vs_currency='usd')
+        except Exception:
+            traceback.print_exc()
+            metrics.count('fetch_errors', source='quotes')
+        return self.quotes
+
+    def fetchAsset(self, symbol, store):
+        """Appends new days to the store of coin symbol. Returns False (stored history is used) if the source failed."""
+        try:
+            store.refresh()
+            return True
+        except Exception:
+            traceback.print_exc()
+            metrics.count('fetch_errors', source=symbol)
+            return False
+
+    def load(self):
+        """
+            Fetches every source concurrently.
+            Returns ({symbol: {column: array} of Date, Value and indicators}, quotes), btc always being there.
+        """
+        with metrics.timer('fetch'):
+            prices = self.pool.submit(self.fetchPrices)
+            quotes = self.pool.submit(self.fetchQuotes).result()
+            # coin histories start as soon as the top list is known, BCHAIN may still be downloading.
+            stores = self.assets.select(quotes)
+            fetches = [self.pool.submit(self.fetchAsset, symbol, store) for symbol, store in stores.items()]
+            prices.result()
+            for fetch in fetches:
+                fetch.result()
+        if len(self.store) == 0:
+            raise RuntimeError('no BTC price history, fetching {} failed'.format(self.store.source))
+        # pushing only the new days through the 1400 and 350 day moving averages.
+        self.indicators.update()
+        # coins without any history yet (first fetch failed) are left out.
+        symbols = [symbol for symbol, store in stores.items() if len(store)]
+        self.assets.update(symbols)
+        dates, values = self.store.read()
+        assets = {'btc': {'Date': dates, 'Value': values, **self.indicators.read()}}
+        for symbol in symbols:
+            assets[symbol] = self.assets.read(symbol)
+        return assets, quotes
@@ -20,118 +20,85 @@
             - Periods where the price dots are purple and close to the 200 week MA have historically been good times to buy.
             - Note: this is a slightly modified version of a concept created by @100trillionUSD.
             - Use the link below to learn more about the original."}
+    - This module is the Dash app, the data frames (Bitcoin) are built in BTC_Pipeline and the figures in BTC_Figures,
+      neither imports Dash (see BTC_Batch for the headless batch mode).
 """
-import numpy as np
-import pandas as pd
-import requests
-import json
+import os
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output
-import plotly.graph_objs as go
-from pycoingecko import CoinGeckoAPI
-
-cg = CoinGeckoAPI()
-class Bitcoin:
-    def __init__(self):
-        """Instantiating empty instance variables."""
-        # BTC daily price for golden ration chart.
-        self.GR_daily_df = ''
-        # monthly data frame used for creating heat map.
-        self.HM_monthly_df = ''
-        # complete BTC historical daily price data frame.
-        self.complete_df = ''
-        # daily btc chart used for the heat map.
-        self.HM_daily_df = ''
-        # distance used for color sequence of heatmap.
-        self.HM_distance = ''
-        # complete list of dates from complete BTC data frame
-        self.complete_dates = ''
-        # list of dates in the HM_monthly data frame
-        self.HM_monthly_dates=''
-        # list of dates in the GR_daily_df data frame
-        self.GR_dates=''
-        # heatmap dates
-        self.HM_dates = ''
-        self.API_url = 'https://www.quandl.com/api/v3/datasets/BCHAIN/MKPRU.json?api_key=vGBx1_TY6raUMRzDz4Df'
-        self.CG_df=''
-        self.updateDataFrames()
-    """
-        updateDataFrames():
-            - Will make a request to quandl url to access BCHAIN API for BTC historical prices.
-            - Uses data to fill all data frames with data in accordance to their use case.
-            - Refer to Heat Map Solution and Logarithmic Solution.
-    """
-    def updateDataFrames(self):
-        # Requesting data from API url. Using json to create a dictionary. Creating data frame from dict.
-        self.complete_df = pd.DataFrame(json.loads(requests.get(self.API_url).text))
-        # 3rd index of dataset column contains a nested list with data [[Date1,Val1],[Date2,Val2],...].
-        self.complete_df = pd.DataFrame(self.complete_df.dataset[3],columns=['Date','Value'])
-        # reverse order of complete data from to ascending datetime order.
-        self.complete_df = self.complete_df.iloc[::-1]
-        # creating 200WMA column to store data for heat map. Taking 1400 day moving average of data.
-        self.complete_df['200WMA'] = self.complete_df['Value'].astype('float').rolling(window=1400).mean()
-
-        # creating copies of daily data frame.
-        self.HM_daily_df = self.complete_df.copy()
-        self.GR_daily_df = self.complete_df.copy()
-        # removing rows if price is 0.
-        self.GR_daily_df = self.GR_daily_df[self.GR_daily_df['Value'] > 0]
-        # creating 350 Daily Moving Average column.
-        self.GR_daily_df['350DMA'] = self.GR_daily_df['Value'].astype('float').rolling(window=350).mean()
-        #removing first 350 rows of data to line up with 350DMA line.
-        self.GR_daily_df = self.GR_daily_df[350:]
-        # creating a series of datetime objects for plotting 350DMA line.
-        self.GR_dates = pd.to_datetime(self.GR_daily_df['Date'])
-
-        # removing first 1400 rows of data to line up with 200WMA line.
-        self.HM_daily_df = self.HM_daily_df[1400:]
-        # Collects one day of data every 4th week (or 28 days).
-        self.HM_monthly_df = self.HM_daily_df[::28]
-        # creating a series of datetime objects for plotting monthly heat map markers.
-        self.HM_monthly_dates = pd.to_datetime(self.HM_monthly_df['Date'])
-        # creating a series of datetime objects for plotting heatmap chart.
-        self.HM_dates = pd.to_datetime(self.HM_daily_df['Date'])
-        # creating a series of datetime objects for plotting Logarithmic chart.
-        self.complete_dates = pd.to_datetime(self.complete_df['Date'])
-        # monthly percent change of the 200WMA used for color sequence of heat map.
-        self.HM_distance = self.HM_monthly_df['200WMA'].pct_change() * 100
-
-        # creating golden ration mutipliers
-        self.GR_daily_df['1.6GRM'] = self.GR_daily_df['350DMA'].astype('float') * 1.6
-        self.GR_daily_df['2GRM'] = self.GR_daily_df['350DMA'].astype('float') * 2.0
-        self.GR_daily_df['3GRM'] = self.GR_daily_df['350DMA'].astype('float') * 3.0
-        self.GR_daily_df['5GRM'] = self.GR_daily_df['350DMA'].astype('float') * 5.0
-        self.GR_daily_df['8GRM'] = self.GR_daily_df['350DMA'].astype('float') * 8.0
-        self.GR_daily_df['13GRM'] = self.GR_daily_df['350DMA'].astype('float') * 13.0
-        self.GR_daily_df['21GRM'] = self.GR_daily_df['350DMA'].astype('float') * 21.0
-
-        #creating coin gecko data frame
-        self.CG_df = cg.get_coins_markets(vs_currency='usd')
-        self.CG_df = pd.DataFrame(
-            self.CG_df,
-            columns=[
-                'symbol',   # crypto symbol
-                'current_price', # crypto current price
-                'price_change_percentage_24h',  # crypto 24hr price change
-            ]
-        )
-        # only taking info on top 10 crypto currencies
-        self.CG_df = self.CG_df.iloc[0:10]
-        # setting symbol names to upper case
-        self.CG_df['symbol'] = self.CG_df['symbol'].str.upper()
-# bitcoin object which will hold all data frames.
-btc_obj = Bitcoin()
+from BTC_Ingest import Ingestor
+from BTC_Refresher import Refresher
+from BTC_Figure_Cache import FigureCache
+from BTC_Downsample import zoomRange, zoomReset
+from BTC_Render import WEBGL, packFigure, UNPACK_FIGURE
+from BTC_Shared import readQuotes, SNAPSHOT_FILE
+from BTC_Quotes import QuoteCache
+from BTC_Metrics import metrics, registerMetrics
+from BTC_Http import registerHttpCache, exportFigures, EXPORT_DIR
+from BTC_Pipeline import Bitcoin, quoteTable
+from BTC_Figures import buildFigures, buildHeatMap, buildGoldenRatio, CHART_NAMES
+# seconds between background data refreshes.
+REFRESH_INTERVAL = 60 * 60
+# seconds between ticker updates in the browser, and seconds the quotes behind it are cached.
+TICKER_INTERVAL = 15
+QUOTE_TTL = 60
+# file written by the loader process (python BTC_Shared.py) in multi-worker mode, see wsgi.py.
+SHARED_FILE = os.environ.get('BTC_SHARED_FILE')
+# workers only map the loader's file, so they can look for a new version often.
+if SHARED_FILE is not None:
+    REFRESH_INTERVAL = 60
+def loadBitcoin():
+    """Returns a new Bitcoin snapshot, reusing the price store, indicator state, heat map buckets and quotes of the current one."""
+    current = refresher.snapshot
+    if SHARED_FILE is not None:
+        btc = Bitcoin(shared=SHARED_FILE, resamplers=current.resamplers if current is not None else None)
+    else:
+        # a warm start snapshot has no ingestor, the first real refresh opens the store
+        # and falls back on the warm start quotes if CoinGecko does not answer.
+        if current is None:
+            btc = Bitcoin()
+        elif current.ingestor is None:
+            btc = Bitcoin(Ingestor(quotes=current.quotes), resamplers=current.resamplers)
+        else:
+            btc = Bitcoin(current.ingestor, resamplers=current.resamplers)
+        # last known good data for the next warm start.
+        btc.saveSnapshot(SNAPSHOT_FILE)
+    # building the figures (of every coin) before the snapshot is published so page loads find them cached.
+    loadFigures(btc)
+    if EXPORT_DIR is not None:
+        exportCharts(btc)
+    return btc
+def warmBitcoin():
+    """Returns a snapshot mapped from the last known good data on disk (no network), None if there is none."""
+    if SHARED_FILE is not None or not os.path.exists(SNAPSHOT_FILE):
+        return None
+    btc = Bitcoin(shared=SNAPSHOT_FILE)
+    loadFigures(btc)
+    return btc
+def loadFigures(btc_obj):
+    """Builds the figures of every coin of a snapshot into the figure cache, no chart request builds them on its path."""
+    for coin in (btc_obj, *btc_obj.assets.values()):
+        figure_cache.load(coin)
+# publishes a new bitcoin object (holding all data frames) every REFRESH_INTERVAL seconds.
+# nothing is loaded at import, the background thread warm starts from disk and then fetches fresh data.
+refresher = Refresher(loadBitcoin, REFRESH_INTERVAL, warm=warmBitcoin)
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 mathjax = 'https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.4/MathJax.js?config=TeX-MML-AM_CHTML'
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets,assets_external_path=mathjax)
+# stage timers and counters on /metrics.
+registerMetrics(app.server)
 
 app.layout = html.Div(
     children=[
         html.Div(
             id='header-img-div',
             children=[
+                # polls the ticker every TICKER_INTERVAL seconds, independent of the charts.
+                dcc.Interval(id='ticker-interval',
+                             interval=TICKER_INTERVAL * 1000,
+                             ),
                 html.Div(
                     id='header-price',
                     children=[],
@@ -191,6 +158,13 @@ app.layout = html.Div(
                           value='btc',
                           style={'visibility':'hidden',}
                           ),
+                # polls until the first data snapshot is loaded, then disabled by returnCharts.
+                dcc.Interval(id='startup-interval',
+                             interval=1000,
+                             ),
+                # packed figures (webgl render mode), unpacked into the graphs in the browser.
+                dcc.Store(id='heatmap-packed'),
+                dcc.Store(id='golden-packed'),
                 html.Div(
                     id='graphs-div',
                     children=[
@@ -277,181 +251,104 @@ app.layout = html.Div(
         ),
     ],
 )
+# webgl render mode sends packed figures to the stores, a clientside callback unpacks them into the graphs.
+if WEBGL:
+    HM_output = Output(component_id='heatmap-packed',component_property='data')
+    GR_output = Output(component_id='golden-packed',component_property='data')
+    for store, graph in (('heatmap-packed', 'heatmap-chart'), ('golden-packed', 'golden-chart')):
+        app.clientside_callback(UNPACK_FIGURE,
+                                Output(component_id=graph,component_property='figure'),
+                                Input(component_id=store,component_property='data'),
+                                )
+else:
+    HM_output = Output(component_id='heatmap-chart',component_property='figure')
+    GR_output = Output(component_id='golden-chart',component_property='figure')
 @app.callback(
-    Output(component_id='heatmap-chart',component_property='figure'),
-    Output(component_id='golden-chart',component_property='figure'),
-    Output(component_id='header-price',component_property='children'),
+    HM_output,
+    GR_output,
+    Output(component_id='startup-interval',component_property='disabled'),
     Input(component_id='input-bar',component_property='value'),
+    Input(component_id='heatmap-chart',component_property='relayoutData'),
+    Input(component_id='golden-chart',component_property='relayoutData'),
+    Input(component_id='startup-interval',component_property='n_intervals'),
 )
-def returnCharts(value):
-    # Heat map figure which will hold all plots significant to the 200WMA Heat Map.
-    HMfig = go.Figure()
-    # Golden ration figure which will hold all plots significant to the Golden ration multiplier.
-    GRfig = go.Figure()
-    # Heat Map BTC 200WMA line.
-    HMfig.add_trace(
-        go.Scatter(
-            x=btc_obj.HM_dates,
-            y=btc_obj.HM_daily_df['200WMA'],
-            mode='lines',
-            legendrank=2,
-            line={'color':'rgb(227, 9, 9)'},
-            name='200WMA',
-        )
-    )
-    # Heat Map BTC Daily price chart.
-    HMfig.add_trace(
-        go.Scatter(
-            x=btc_obj.HM_dates,
-            y=btc_obj.HM_daily_df['Value'],
-            mode='lines',
-            legendrank=1,
-            line={'color':'rgb(0, 89, 255)'},
-            showlegend=False,
-        )
-    )
-    # heat map markers
-    HMfig.add_trace(go.Scatter(x=btc_obj.HM_monthly_dates,
-                               y=btc_obj.HM_monthly_df['Value'],
-                               marker={'color':btc_obj.HM_distance,
-                                       'colorscale':'rainbow',
-                                       'cmin':0,
-                                       'cmax':20,
-                                       'size':8,
-                                       },
-                               mode='markers',
-                               showlegend=False,
-                               )
-                    )
-    HMfig.update_yaxes(type='log')
-
-    # 350 day moving average
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['350DMA'],
-            mode='lines',
-            legendrank=2,
-            line={'color': 'rgb(255, 204, 0)'},
-            name='350DMA',
-        ),
-    )
-    # Golden Ratio Multiplier(GRM): 1.6
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['1.6GRM'],
-            mode='lines',
-            legendrank=3,
-            line={'color': 'rgb(0, 201, 54)'},
-            name='1.6 GRM',
-            opacity=0.4,
-        )
-    )
-    # Golden Ratio Multiplier(GRM): 2.0
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['2GRM'],
-            mode='lines',
-            legendrank=3,
-            line={'color': 'rgb(245, 0, 82)'},
-            name='2 GRM',
-            opacity=0.4,
-        )
-    )
-    # Golden Ratio Multiplier(GRM): 3.0
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['3GRM'],
-            mode='lines',
-            legendrank=4,
-            line={'color': 'rgb(219, 15, 206)'},
-            name='3 GRM',
-            opacity=0.4,
-        )
-    )
-    # Golden Ratio Multiplier(GRM): 5.0
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['5GRM'],
-            mode='lines',
-            legendrank=4,
-            line={'color': 'rgb(73, 0, 122)'},
-            name='5 GRM',
-            opacity=0.4,
-        )
-    )
-    # Golden Ratio Multiplier(GRM): 8.0
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['8GRM'],
-            mode='lines',
-            legendrank=4,
-            opacity=0.4,
-            line={'color': 'rgb(11, 1, 97)',
-                  'dash':'dash'
-                  },
-            name='8 GRM',
-        )
-    )
-    # Golden Ratio Multiplier(GRM): 13.0
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['13GRM'],
-            mode='lines',
-            legendrank=4,
-            opacity=0.4,
-            line={'color': 'rgb(11, 1, 97)',
-                  'dash': 'dash'
-                  },
-            name='13 GRM',
-        )
-    )
-    # Golden Ratio Multiplier(GRM): 21.0
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['21GRM'],
-            mode='lines',
-            legendrank=4,
-            opacity=0.4,
-            line={'color': 'rgb(11, 1, 97)',
-                  'dash': 'dash'
-                  },
-            name='21 GRM',
-        )
-    )
-    # BTC Daily price chart.
-    GRfig.add_trace(
-        go.Scatter(
-            x=btc_obj.GR_dates,
-            y=btc_obj.GR_daily_df['Value'],
-            mode='lines',
-            legendrank=1,
-            line={'color': 'rgb(0, 89, 255)'},
-            name='BTC Price',
-        )
-    )
-    GRfig.update_yaxes(type='log',
-                       title='Price'
-                       )
-    GRfig.update_xaxes(title='Date')
+@metrics.instrumented('returnCharts')
+def returnCharts(value, HM_relayout, GR_relayout, n_intervals):
+    # reading the published snapshot once so a refresh during this callback can not mix old and new data.
+    btc_obj = refresher.snapshot
+    # data is still loading, the page stays up and startup-interval asks again.
+    if btc_obj is None:
+        return dash.no_update, dash.no_update, False
+    # input-bar selects the coin (btc or one of the other top coins).
+    btc_obj = btc_obj.asset(value)
+    # figures are only built (and packed in webgl mode) once per data version.
+    HMfig, GRfig = figure_cache.figures(btc_obj)
+    # a chart was zoomed or reset, only that chart is sent back, at full resolution for the visible range.
+    # other relayouts (autosize after the first render, y only zoom, dragmode) leave the chart as it is.
+    trigger = dash.callback_context.triggered[0]['prop_id']
+    if trigger == 'heatmap-chart.relayoutData':
+        xrange = zoomRange(HM_relayout)
+        if xrange:
+            with metrics.timer('zoom_figure'):
+                HMfig = buildHeatMap(btc_obj, xrange)
+                if WEBGL:
+                    HMfig = packFigure(HMfig)
+        elif not zoomReset(HM_relayout):
+            HMfig = dash.no_update
+        return HMfig, dash.no_update, dash.no_update
+    if trigger == 'golden-chart.relayoutData':
+        xrange = zoomRange(GR_relayout)
+        if xrange:
+            with metrics.timer('zoom_figure'):
+                GRfig = buildGoldenRatio(btc_obj, xrange)
+                if WEBGL:
+                    GRfig = packFigure(GRfig)
+        elif not zoomReset(GR_relayout):
+            GRfig = dash.no_update
+        return dash.no_update, GRfig, dash.no_update
 
+    # data is shown, no more polling.
+    return HMfig, GRfig, True
+"""
+    chartPayloads(symbol):
+        - Returns (data version, time built, {chart name: figure json bytes}) of the latest figures of coin symbol.
+        - None before the first snapshot or if the coin is not loaded.
+"""
+def chartPayloads(symbol):
+    btc_obj = refresher.snapshot
+    if btc_obj is None:
+        return None
+    btc_obj = btc_obj.asset(symbol)
+    if btc_obj.symbol != symbol.lower():
+        return None
+    version, figures, payloads, built = figure_cache.load(btc_obj)
+    return version, built, dict(zip(CHART_NAMES, payloads))
+"""
+    exportCharts(btc_obj):
+        - Writes the figures of every coin of a snapshot to EXPORT_DIR as <symbol>-<chart>.json, with .gz and .br copies.
+"""
+def exportCharts(btc_obj):
+    for coin in (btc_obj, *btc_obj.assets.values()):
+        payloads = figure_cache.payloads(coin)
+        exportFigures(EXPORT_DIR, {'{}-{}.json'.format(coin.symbol, name): data for name, data in zip(CHART_NAMES, payloads)})
+"""
+    renderTicker(quotes):
+        - Returns the header ticker children (symbol, price and 24h change of the top 10 coins in quotes).
+"""
+def renderTicker(quotes):
+    CG_df = quoteTable(quotes)
     # empty list to be filled and returned
     myList = list()
     # creating table for crypto prices
-    for index, row in btc_obj.CG_df.iterrows():
+    for symbol, price, change in zip(CG_df['symbol'].tolist(),
+                                     CG_df['current_price'].tolist(),
+                                     CG_df['price_change_percentage_24h'].tolist()):
         # assigning red color if price change is less than 0, else green
-        color = 'rgb(255,17,0)' if row['price_change_percentage_24h'] < 0 else 'rgb(3, 163, 30)'
+        color = 'rgb(255,17,0)' if change < 0 else 'rgb(3, 163, 30)'
         t = html.Div(
             children=[
                 html.Th(
-                    html.H6(row['symbol'],
+                    html.H6(symbol,
                             style={'display': 'inline-block',
                                    'font-size': '14px',
                                    'margin-left':'25px',
@@ -459,7 +356,7 @@ def returnCharts(value):
                             )
                 ),
                 html.Th(
-                    html.H6("${:,.2f}".format(row['current_price']),
+                    html.H6("${:,.2f}".format(price),
                             style={'display': 'inline-block',
                                    'font-size': '14px',
                                    'color':color,
@@ -467,7 +364,7 @@ def returnCharts(value):
                             )
                 ),
                 html.Th(
-                    html.H6("%{:,.1f}".format(row['price_change_percentage_24h']),
+                    html.H6("%{:,.1f}".format(change),
                             style={'display': 'inline-block',
                                    'font-size': '14px',
                                    'color': color,
@@ -478,6 +375,38 @@ def returnCharts(value):
                      }
         )
         myList.append(t)
-    return HMfig, GRfig, myList
+    return myList
+"""
+    fetchQuotes():
+        - Returns the latest quotes for the ticker, None if there are none yet.
+        - Multi-worker mode reads the quotes the loader writes next to the shared file.
+"""
+def fetchQuotes():
+    if SHARED_FILE is not None:
+        return readQuotes(SHARED_FILE)
+    btc_obj = refresher.snapshot
+    if btc_obj is None:
+        return None
+    # warm start snapshot, no ingestor yet.
+    if btc_obj.ingestor is None:
+        return btc_obj.quotes
+    return btc_obj.ingestor.fetchQuotes()
+# rendered ticker, refetched once it is older than QUOTE_TTL seconds.
+quote_cache = QuoteCache(fetchQuotes, renderTicker, QUOTE_TTL)
+@app.callback(
+    Output(component_id='header-price',component_property='children'),
+    Input(component_id='ticker-interval',component_property='n_intervals'),
+)
+@metrics.instrumented('returnTicker')
+def returnTicker(n_intervals):
+    return quote_cache.get()
+# figures of the latest data version.
+figure_cache = FigureCache(buildFigures, pack=packFigure if WEBGL else None)
+# figures of the latest data version on /charts, with ETags, 304s and pre-compressed responses.
+registerHttpCache(app.server, chartPayloads)
+# the debug reloader runs this module twice: in a watcher process and in the child serving requests
+# (WERKZEUG_RUN_MAIN set). Only the serving process refreshes, two refreshers would write the same store.
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    refresher.start()
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
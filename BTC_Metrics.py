@@ -0,0 +1,132 @@
+"""
+    BTC_Metrics:
+        - Stage timers and counters for the hot paths (API fetches, parsing, rolling averages, data frames,
+          figure build and encode, callbacks), kept in one process wide Metrics object: metrics.
+        - registerMetrics(server) adds a Prometheus text format /metrics route to the flask server of the dash app
+          and counts requests and response bytes per route.
+        - Opt-in profiling: with BTC_PROFILE set to a directory, GET /profile/<callback> arms the next call of that
+          callback to run under cProfile, the stats are dumped to <BTC_PROFILE>/<callback>-<time>.prof
+          (open with pstats, snakeviz or flameprof for a flame graph).
+        - In multi-worker mode every worker keeps its own metrics.
+"""
+import os
+import time
+import cProfile
+import functools
+import threading
+from contextlib import contextmanager
+
+# directory profiles are dumped to, profiling is disabled if not set.
+PROFILE_DIR = os.environ.get('BTC_PROFILE')
+
+
+class Metrics:
+    def __init__(self):
+        """Instantiating empty timers and counters."""
+        # stage -> [count, total seconds, max seconds].
+        self.timers = {}
+        # (name, labels) -> value, labels being a tuple of (label, value).
+        self.counters = {}
+        # names of callbacks to profile on their next call.
+        self.armed = set()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage):
+        """Times the block under stage (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self.lock:
+                timer = self.timers.setdefault(stage, [0, 0.0, 0.0])
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+    def count(self, name, value=1, **labels):
+        """Adds value to the counter name{labels}."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def arm(self, name):
+        """Profiles the next call of the callback name."""
+        with self.lock:
+            self.armed.add(name)
+
+    def disarm(self, name):
+        """Returns True (and disarms it) if the callback name is armed."""
+        with self.lock:
+            if name not in self.armed:
+                return False
+            self.armed.discard(name)
+            return True
+
+    def instrumented(self, name):
+        """Decorator timing every call of a function under name, running it under cProfile when armed."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    if not self.disarm(name):
+                        return func(*args, **kwargs)
+                    profile = cProfile.Profile()
+                    try:
+                        return profile.runcall(func, *args, **kwargs)
+                    finally:
+                        profile.dump_stats(os.path.join(PROFILE_DIR, '{}-{}.prof'.format(name, int(time.time()))))
+            return wrapper
+        return decorator
+
+    def render(self):
+        """Returns every timer and counter in the Prometheus text format."""
+        with self.lock:
+            timers = sorted(self.timers.items())
+            lines = ['# TYPE btc_stage_seconds summary']
+            for stage, (count, total, longest) in timers:
+                lines.append('btc_stage_seconds_count{{stage="{}"}} {}'.format(stage, count))
+                lines.append('btc_stage_seconds_sum{{stage="{}"}} {:.6f}'.format(stage, total))
+            # a summary only has _count, _sum and quantiles, the longest run is a family of its own.
+            lines.append('# TYPE btc_stage_seconds_max gauge')
+            for stage, (count, total, longest) in timers:
+                lines.append('btc_stage_seconds_max{{stage="{}"}} {:.6f}'.format(stage, longest))
+            names = sorted({name for name, labels in self.counters})
+            for name in names:
+                lines.append('# TYPE btc_{}_total counter'.format(name))
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        label = ','.join('{}="{}"'.format(*item) for item in labels)
+                        lines.append('btc_{}_total{} {}'.format(name, '{' + label + '}' if label else '', value))
+        return '\n'.join(lines) + '\n'
+
+
+# process wide metrics.
+metrics = Metrics()
+
+
+def registerMetrics(server):
+    """Adds /metrics (and /profile/<callback> if BTC_PROFILE is set) to server, counting responses per route."""
+    from flask import Response, request
+
+    @server.after_request
+    def countResponse(response):
+        route = request.url_rule.rule if request.url_rule is not None else 'other'
+        metrics.count('http_requests', route=route, status=response.status_code)
+        # streamed responses have no known length.
+        if response.content_length is not None:
+            metrics.count('http_response_bytes', response.content_length, route=route)
+        return response
+
+    @server.route('/metrics')
+    def metricsRoute():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    if PROFILE_DIR is not None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+
+        @server.route('/profile/<name>')
+        def profileRoute(name):
+            metrics.arm(name)
+            return Response('next {} call will be profiled to {}\n'.format(name, PROFILE_DIR), mimetype='text/plain')
@@ -0,0 +1,196 @@
+"""
+    BTC_Pipeline:
+        - BTC (and top coin) data frames for the 200WMA Heat Map and Golden Ratio charts, without any Dash code.
+        - Bitcoin fetches (or maps from a shared file) the price history, indicators and CoinGecko quotes
+          and builds every frame the charts need, used by the Dash app (BTC_Longterm_Data) and the batch mode (BTC_Batch).
+        - indicatorTable() returns the daily indicator values as one flat data frame for exporting.
+"""
+import numpy as np
+import pandas as pd
+from BTC_Price_Store import API_URL
+from BTC_Ingest import Ingestor
+from BTC_Resample import BucketResampler
+from BTC_Shared import readShared, writeShared
+from BTC_Metrics import metrics
+
+"""
+    quoteTable(quotes):
+        - Returns the coin gecko data frame (symbol, price, 24h change) of the top 10 crypto currencies in quotes.
+"""
+def quoteTable(quotes):
+    CG_df = pd.DataFrame(
+        quotes,
+        columns=[
+            'symbol',   # crypto symbol
+            'current_price', # crypto current price
+            'price_change_percentage_24h',  # crypto 24hr price change
+        ]
+    )
+    # only taking info on top 10 crypto currencies
+    CG_df = CG_df.iloc[0:10].copy()
+    # setting symbol names to upper case
+    CG_df['symbol'] = CG_df['symbol'].str.upper()
+    return CG_df
+class Bitcoin:
+    # golden ratio multipliers of the 350DMA, plotted as bands on the golden ratio chart.
+    GR_multipliers = np.array([1.6, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0])
+
+    def __init__(self, ingestor=None, shared=None, resamplers=None, symbol='btc', data=None, overlay=None):
+        """
+            Instantiating empty instance variables. ingestor (price store, indicators, quotes) is shared with the previous snapshot if given.
+            If shared (path of the file written by the loader process) is given, data is mapped from it instead of fetched.
+            resamplers ({symbol: heat map marker buckets}) are also passed on from the previous snapshot, only their latest bucket is redone.
+            symbol is the coin of this instance, its frames are built from data ((columns, quotes)) if given.
+            overlay (BTC_Candles.IntradayEngine.overlay()) is the open intraday day, drawn on the charts if given.
+        """
+        # BTC daily price for golden ration chart.
+        self.GR_daily_df = ''
+        # monthly data frame used for creating heat map.
+        self.HM_monthly_df = ''
+        # complete BTC historical daily price data frame.
+        self.complete_df = ''
+        # daily btc chart used for the heat map.
+        self.HM_daily_df = ''
+        # distance used for color sequence of heatmap.
+        self.HM_distance = ''
+        # complete list of dates from complete BTC data frame
+        self.complete_dates = ''
+        # list of dates in the HM_monthly data frame
+        self.HM_monthly_dates=''
+        # list of dates in the GR_daily_df data frame
+        self.GR_dates=''
+        # heatmap dates
+        self.HM_dates = ''
+        self.API_url = API_URL
+        self.CG_df=''
+        # data version (number of days and last date), figures are rebuilt when it changes.
+        self.version = ''
+        # coin of this instance and instances of the other top coins by symbol (only filled on the btc one).
+        self.symbol = symbol
+        self.assets = {}
+        # provisional price and moving averages of the open day (intraday data), None for daily data.
+        self.overlay = overlay
+        # shared file written by the loader process (multi-worker mode), None when this process fetches the data.
+        self.shared = shared
+        # fetches BCHAIN prices into the local store (200WMA and 350DMA kept up to date one new day at a time)
+        # and the CoinGecko quotes, concurrently.
+        self.ingestor = ingestor
+        if self.shared is None and self.ingestor is None and data is None:
+            self.ingestor = Ingestor()
+        # picks one heat map marker day per 4 week (or calendar month) bucket, one per coin.
+        self.resamplers = resamplers if resamplers is not None else {}
+        self.resampler = self.resamplers.setdefault(symbol, BucketResampler())
+        if data is not None:
+            with metrics.timer('frames'):
+                self.buildDataFrames(*data)
+        else:
+            self.updateDataFrames()
+    """
+        updateDataFrames():
+            - Will make a request to quandl url to access BCHAIN API for BTC prices newer than the local store.
+            - In multi-worker mode the columns and quotes are mapped from the loader's shared file instead.
+            - Uses data to fill all data frames with data in accordance to their use case.
+            - The other top coins get their own Bitcoin instance in assets, built the same way from their columns.
+            - Refer to Heat Map Solution and Logarithmic Solution.
+    """
+    def updateDataFrames(self):
+        if self.shared is not None:
+            assets, quotes = readShared(self.shared)
+        else:
+            # appending rows newer than the last stored date to the local store and
+            # pushing only the new days through the 1400 and 350 day moving averages (for every coin).
+            assets, quotes = self.ingestor.load()
+        with metrics.timer('frames'):
+            self.buildDataFrames(assets[self.symbol], quotes)
+        self.assets = {symbol: Bitcoin(resamplers=self.resamplers, symbol=symbol, data=(columns, quotes))
+                       for symbol, columns in assets.items() if symbol != self.symbol}
+    """
+        asset(symbol):
+            - Returns the instance of coin symbol (this one for its own symbol or a coin that is not loaded).
+    """
+    def asset(self, symbol):
+        return self.assets.get(str(symbol).lower(), self)
+    """
+        buildDataFrames(columns, quotes):
+            - Fills all data frames from columns (Date, Value, 200WMA, 350DMA arrays) and quotes (CoinGecko markets).
+    """
+    def buildDataFrames(self, columns, quotes):
+        # kept to write this snapshot to disk (columns are memory maps or views, no extra copy).
+        self.columns = columns
+        self.quotes = quotes
+        # store columns are already in ascending datetime order.
+        # creating 200WMA column to store data for heat map (1400 day moving average of data).
+        # copy=False keeps the memory mapped columns instead of copying them into the frame.
+        self.complete_df = pd.DataFrame({'Date': columns['Date'], 'Value': columns['Value'], '200WMA': columns['200WMA']}, copy=False)
+
+        # store dates (days) are converted to nanoseconds here once (shared files already hold nanoseconds),
+        # every frame below is built from these arrays of complete_df.
+        self.complete_dates = self.complete_df['Date']
+        dates, values = self.complete_dates.to_numpy(), self.complete_df['Value'].to_numpy()
+        self.version = '{}-{}'.format(len(dates), np.datetime64(dates[-1], 'D') if len(dates) else '')
+        # the open day changes with every tick, figures with an overlay are rebuilt when its close does.
+        if self.overlay is not None:
+            self.version += '+{}'.format(self.overlay['Close'])
+
+        # positions of days with a price above 0, first 350 removed to line up with 350DMA line.
+        GR_rows = np.flatnonzero(values > 0)[350:]
+        # usually one unbroken run of days, a slice keeps the columns as views.
+        if len(GR_rows) and GR_rows[-1] - GR_rows[0] + 1 == len(GR_rows):
+            GR_rows = slice(GR_rows[0], GR_rows[-1] + 1)
+        # golden ratio frame only holds date, price and 350DMA, multiplier bands are derived on demand.
+        self.GR_daily_df = pd.DataFrame({
+            'Date': dates[GR_rows],
+            'Value': values[GR_rows],
+            # 350 Daily Moving Average (moving average over days with a price above 0).
+            '350DMA': columns['350DMA'][GR_rows],
+        }, copy=False)
+        # series of datetime objects for plotting 350DMA line.
+        self.GR_dates = self.GR_daily_df['Date']
+
+        # removing first 1400 rows of data to line up with 200WMA line (view on complete_df, not a copy).
+        self.HM_daily_df = self.complete_df.iloc[1400:]
+        # series of datetime objects for plotting heatmap chart.
+        self.HM_dates = self.HM_daily_df['Date']
+        # Collects the first day of every 4 week (28 day) bucket, by date so gaps in the data do not shift later markers.
+        HM_rows = self.resampler.update(self.HM_dates.to_numpy())
+        # rows are taken column by column, taking them from the frame would first consolidate HM_daily_df
+        # (and copy its columns, HM_daily_df would no longer be a view).
+        self.HM_monthly_df = pd.DataFrame({column: self.HM_daily_df[column].to_numpy()[HM_rows] for column in self.HM_daily_df},
+                                          index=self.HM_daily_df.index[HM_rows])
+        # series of datetime objects for plotting monthly heat map markers.
+        self.HM_monthly_dates = self.HM_monthly_df['Date']
+        # monthly percent change of the 200WMA used for color sequence of heat map.
+        self.HM_distance = self.HM_monthly_df['200WMA'].pct_change() * 100
+
+        #creating coin gecko data frame
+        self.CG_df = quoteTable(quotes)
+    """
+        goldenRatioBands(rows):
+            - Returns the golden ratio multiplier bands as one (rows, multipliers) array, broadcasting 350DMA * GR_multipliers.
+            - Column k is the 350DMA times GR_multipliers[k], only rows (positions in GR_daily_df) are computed.
+    """
+    def goldenRatioBands(self, rows=slice(None)):
+        return self.GR_daily_df['350DMA'].to_numpy()[rows, None] * self.GR_multipliers
+    """
+        saveSnapshot(path):
+            - Writes the columns and quotes of this snapshot to path (same format as the multi-worker shared file).
+            - Used as the last known good data to warm start the next process.
+    """
+    def saveSnapshot(self, path):
+        assets = {symbol: coin.columns for symbol, coin in self.assets.items()}
+        writeShared({self.symbol: self.columns, **assets}, self.quotes, path)
+    """
+        indicatorTable():
+            - Returns one row per day: Date, Value, 200WMA, 200WMA 4W % (heat map % change, on marker days only),
+              350DMA and the golden ratio multiplier bands (1.6GRM ... 21GRM).
+    """
+    def indicatorTable(self):
+        table = self.complete_df.copy()
+        # marker rows keep their complete_df labels, the other days are left as NaN.
+        table['200WMA 4W %'] = self.HM_distance
+        dma = np.asarray(self.columns['350DMA'], dtype=np.float64)
+        table['350DMA'] = dma
+        bands = dma[:, None] * self.GR_multipliers
+        for k, multiplier in enumerate(self.GR_multipliers):
+            table['{:g}GRM'.format(multiplier)] = bands[:, k]
+        return table
@@ -0,0 +1,152 @@
+"""
+    BTC_Price_Store:
+        - Keeps a local copy of the BCHAIN/MKPRU daily BTC price history so it is not re-downloaded on every refresh.
+        - Each column is stored as a raw binary file (Date as int64 days since 1970-01-01, Value as float64).
+        - Columns are read back through numpy memory maps, so opening the store does not parse or copy history.
+        - A refresh only requests rows newer than the last stored date and appends them to the end of each file.
+        - The source can be the Quandl url or a local json file in the same format (used to test offline).
+        - Writers (the server, a reloader child, a batch cron job) may share a directory: refresh() and append() hold an
+          exclusive flock on store.lock, and append() skips days that are not newer than the last stored date.
+"""
+import os
+import json
+import fcntl
+import threading
+from contextlib import contextmanager
+import numpy as np
+import requests
+from BTC_Metrics import metrics
+
+# BCHAIN/MKPRU daily BTC price dataset on Quandl.
+API_URL = 'https://www.quandl.com/api/v3/datasets/BCHAIN/MKPRU.json?api_key=vGBx1_TY6raUMRzDz4Df'
+# default directory used for the store files, next to this module.
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'btc_store')
+
+
+class PriceStore:
+    # column name -> numpy dtype of the raw binary file holding it.
+    columns = {'Date': np.int64, 'Value': np.float64}
+
+    def __init__(self, source, directory=STORE_DIR):
+        """Instantiating store for a source (url or local json file) inside directory."""
+        # Quandl url or path to a local json file with the same layout.
+        self.source = source
+        # directory holding one binary file per column.
+        self.directory = directory
+        # object making the http requests (requests module or a pooled requests.Session) and their timeout in seconds.
+        self.session = requests
+        self.timeout = None
+        os.makedirs(self.directory, exist_ok=True)
+        # cross process lock of the directory, reentrant within this object (refresh() appends while holding it).
+        self.lock = threading.RLock()
+        self.lock_file = None
+        self.lock_depth = 0
+
+    @contextmanager
+    def locked(self):
+        """Holds an exclusive lock on the store directory for the block, writers in other processes wait for it."""
+        with self.lock:
+            if self.lock_depth == 0:
+                self.lock_file = open(os.path.join(self.directory, 'store.lock'), 'a')
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+            self.lock_depth += 1
+            try:
+                yield
+            finally:
+                self.lock_depth -= 1
+                if self.lock_depth == 0:
+                    # closing the file releases the flock.
+                    self.lock_file.close()
+                    self.lock_file = None
+
+    def path(self, column):
+        """Returns path of the binary file holding column."""
+        return os.path.join(self.directory, column + '.bin')
+
+    def readColumn(self, column, rows=None):
+        """Returns a read only memory map of column (first rows entries if rows is given). Extra columns are float64."""
+        dtype = np.dtype(self.columns.get(column, np.float64))
+        path = self.path(column)
+        size = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        rows = size if rows is None else min(rows, size)
+        # np.memmap can not map an empty file.
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+    def __len__(self):
+        """Number of complete rows, a row only counts once every column has been written."""
+        return min(len(self.readColumn(column)) for column in self.columns)
+
+    def read(self):
+        """Returns (dates, values) arrays, dates as datetime64[D] and values as float64."""
+        rows = len(self)
+        dates = self.readColumn('Date', rows).view('datetime64[D]')
+        values = self.readColumn('Value', rows)
+        return dates, values
+
+    def lastDate(self):
+        """Returns last stored date as datetime64[D], None if the store is empty."""
+        rows = len(self)
+        if rows == 0:
+            return None
+        return self.readColumn('Date', rows)[rows - 1].astype('datetime64[D]')
+
+    def append(self, dates, values):
+        """Appends rows to the end of every column file, rows not newer than the last stored date are skipped."""
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        values = np.asarray(values, dtype=np.float64)
+        with self.locked():
+            # another writer may have appended the same days since they were fetched.
+            last = self.lastDate()
+            if last is not None:
+                dates, values = dates[dates > last], values[dates > last]
+            rows = len(self)
+            # dropping any partially written row left behind by an interrupted append.
+            for column, dtype in self.columns.items():
+                with open(self.path(column), 'ab') as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+            # Value is written before Date so a crash never leaves a date without its value.
+            with open(self.path('Value'), 'ab') as f:
+                f.write(values.tobytes())
+            with open(self.path('Date'), 'ab') as f:
+                f.write(dates.astype(np.int64).tobytes())
+        return len(dates)
+
+    def fetchRows(self, start=None):
+        """
+            Returns (dates, values) newer than start (datetime64[D] or None) in ascending date order.
+            Only rows after start are requested from the Quandl API, a local json file is filtered after loading.
+        """
+        if os.path.exists(self.source):
+            with open(self.source) as f:
+                text = f.read()
+        else:
+            params = {'order': 'asc'}
+            if start is not None:
+                params['start_date'] = str(start + np.timedelta64(1, 'D'))
+            with metrics.timer('fetch_prices'):
+                response = self.session.get(self.source, params=params, timeout=self.timeout)
+                response.raise_for_status()
+                text = response.text
+        with metrics.timer('parse_prices'):
+            # dataset contains a nested list with data [[Date1,Val1],[Date2,Val2],...].
+            rows = json.loads(text)['dataset']['data']
+            dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+            values = np.array([row[1] for row in rows], dtype=np.float64)
+            order = np.argsort(dates, kind='stable')
+            dates, values = dates[order], values[order]
+            if start is not None:
+                newer = dates > start
+                dates, values = dates[newer], values[newer]
+        metrics.count('price_rows_fetched', len(dates))
+        return dates, values
+
+    def refresh(self):
+        """Fetches rows newer than the last stored date and appends them. Returns number of rows added."""
+        # locked from reading the last date to the append, a second writer waits and then fetches only newer rows.
+        with self.locked():
+            dates, values = self.fetchRows(self.lastDate())
+            if len(dates) == 0:
+                return 0
+            return self.append(dates, values)
@@ -0,0 +1,49 @@
+"""
+    BTC_Quotes:
+        - Short lived cache of the header ticker (top 10 coin quotes), independent of the chart data snapshot.
+        - The rendered ticker is kept for ttl seconds, every page polling the ticker in that time gets the same object.
+        - Once stale the cached ticker is still returned while new quotes are fetched in a background thread,
+          so a slow quote source never delays the ticker callback. Only the very first call waits for quotes.
+        - If fetching fails or returns nothing, the last good ticker keeps being served.
+"""
+import threading
+import time
+import traceback
+
+
+class QuoteCache:
+    def __init__(self, fetch, render, ttl):
+        """Instantiating empty cache for fetch (callable returning quotes or None) and render (quotes -> ticker)."""
+        # callable returning the latest quotes, None if there are none yet.
+        self.fetch = fetch
+        # callable turning quotes into the ticker children.
+        self.render = render
+        # seconds a rendered ticker is fresh.
+        self.ttl = ttl
+        # (time fetched, rendered ticker), None until quotes are fetched.
+        self.entry = None
+        # only one fetch runs at a time.
+        self.lock = threading.Lock()
+
+    def update(self):
+        """Fetches and renders new quotes (keeping the last ticker on failure)."""
+        try:
+            quotes = self.fetch()
+            if quotes is not None:
+                self.entry = (time.monotonic(), self.render(quotes))
+        except Exception:
+            traceback.print_exc()
+        finally:
+            self.lock.release()
+
+    def get(self):
+        """Returns the cached ticker, starting a background update once it is older than ttl."""
+        entry = self.entry
+        if entry is None:
+            # nothing to serve yet, waiting for the first quotes.
+            self.lock.acquire()
+            self.update()
+            return self.entry[1] if self.entry is not None else []
+        if time.monotonic() - entry[0] >= self.ttl and self.lock.acquire(blocking=False):
+            threading.Thread(target=self.update, name='btc-quotes', daemon=True).start()
+        return entry[1]
@@ -0,0 +1,75 @@
+"""
+    BTC_Refresher:
+        - Rebuilds the chart data in a background thread so page loads never wait on a refresh.
+        - Every refresh builds a brand new snapshot object and publishes it with a single reference assignment.
+        - A published snapshot is never modified, readers grab refresher.snapshot once and use that object throughout.
+        - If a refresh fails the last good snapshot keeps being served and the refresh is retried sooner.
+        - Nothing is built when the refresher is created, the thread first publishes an optional warm start snapshot
+          (e.g. last known good data on disk) and then builds a fresh one, so starting a server never blocks on a fetch.
+"""
+import threading
+import traceback
+
+
+class Refresher:
+    def __init__(self, build, interval, warm=None, retry=30):
+        """
+            Instantiating refresher for build (callable returning a new snapshot) every interval seconds.
+            warm (callable returning a snapshot or None) is published before the first build, failed builds are retried after retry seconds.
+        """
+        # callable returning a new, fully built snapshot.
+        self.build = build
+        # seconds between refreshes.
+        self.interval = interval
+        # callable returning a quick snapshot to serve until the first build finishes.
+        self.warm = warm
+        # seconds before retrying a failed refresh.
+        self.retry = min(retry, interval)
+        # last published snapshot, None until the first build finishes.
+        self.snapshot = None
+        # only one build runs at a time.
+        self.lock = threading.Lock()
+        # set to stop the background thread.
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def refresh(self):
+        """Builds a new snapshot and publishes it. Returns the published snapshot."""
+        with self.lock:
+            snapshot = self.build()
+            # single reference swap, readers see either the old or the new snapshot, never a mix.
+            self.snapshot = snapshot
+        return snapshot
+
+    def run(self):
+        """Background loop, warm starting and then refreshing every interval seconds until stopped."""
+        if self.snapshot is None and self.warm is not None:
+            try:
+                snapshot = self.warm()
+                if snapshot is not None:
+                    self.snapshot = snapshot
+            except Exception:
+                traceback.print_exc()
+        # first refresh right away.
+        wait = 0
+        while not self.stopped.wait(wait):
+            try:
+                self.refresh()
+                wait = self.interval
+            except Exception:
+                # keeping the last good snapshot, trying again sooner.
+                traceback.print_exc()
+                wait = self.retry
+
+    def start(self):
+        """Starts the background thread (does nothing if it is already running)."""
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, name='btc-refresher', daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the background thread, waiting up to timeout seconds (forever if None) for a running refresh to end."""
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
@@ -0,0 +1,85 @@
+"""
+    BTC_Render:
+        - Optional high performance render mode for slow browsers, BTC_RENDER_MODE=webgl (default svg).
+        - WebGL mode draws every line with go.Scattergl, x values are epoch milliseconds on a date axis instead of
+          datetime objects serialized as ISO strings one by one.
+        - Figures are sent packed: every x, y and marker color array is a base64 string of little endian float64,
+          identical arrays (the x shared by the 350DMA and the seven multiplier bands) are sent once and the traces
+          refer to them by name.
+        - The bundled plotly.js has no base64 array support, UNPACK_FIGURE is a clientside callback decoding each
+          array once into a Float64Array and handing the same typed array object to every trace that uses it.
+"""
+import os
+import json
+import base64
+import numpy as np
+import plotly.io as pio
+import plotly.graph_objs as go
+
+# 'svg' (go.Scatter, plain figures) or 'webgl' (go.Scattergl, packed figures).
+RENDER_MODE = os.environ.get('BTC_RENDER_MODE', 'svg')
+WEBGL = RENDER_MODE == 'webgl'
+# trace type of every chart line.
+Scatter = go.Scattergl if WEBGL else go.Scatter
+
+
+def xValues(dates):
+    """Returns dates (datetime Series) as plotted, epoch milliseconds in WebGL mode."""
+    if not WEBGL:
+        return dates
+    return np.asarray(dates, dtype='datetime64[ms]').astype(np.int64).astype(np.float64)
+
+
+def packFigure(fig):
+    """Returns fig (go.Figure) as {'arrays': {name: base64 float64}, 'figure': figure with arrays replaced by {'array': name}}."""
+    figure = fig.to_plotly_json()
+    # array bytes -> name, equal arrays get the same name.
+    names = {}
+    arrays = {}
+
+    def pack(values):
+        data = np.asarray(values, dtype='<f8').tobytes()
+        if data not in names:
+            names[data] = str(len(names))
+            arrays[names[data]] = base64.b64encode(data).decode()
+        return {'array': names[data]}
+
+    for trace in figure['data']:
+        for key in ('x', 'y'):
+            if key in trace:
+                trace[key] = pack(trace[key])
+        if isinstance(trace.get('marker', {}).get('color'), np.ndarray):
+            trace['marker']['color'] = pack(trace['marker']['color'])
+    # the date axis has to be set, epoch numbers alone would be plotted on a linear axis.
+    figure['layout'].setdefault('xaxis', {})['type'] = 'date'
+    return {'arrays': arrays, 'figure': json.loads(pio.to_json(figure, validate=False))}
+
+
+# clientside callback turning the packed figure of a dcc.Store into the figure of a dcc.Graph.
+UNPACK_FIGURE = '''
+function(packed) {
+    if (!packed) {
+        return window.dash_clientside.no_update;
+    }
+    var arrays = {};
+    Object.keys(packed.arrays).forEach(function(name) {
+        var bytes = atob(packed.arrays[name]);
+        var view = new Uint8Array(bytes.length);
+        for (var i = 0; i < bytes.length; i++) {
+            view[i] = bytes.charCodeAt(i);
+        }
+        arrays[name] = new Float64Array(view.buffer);
+    });
+    function unpack(value) {
+        return value && value.array !== undefined ? arrays[value.array] : value;
+    }
+    var data = packed.figure.data.map(function(trace) {
+        var copy = Object.assign({}, trace, {x: unpack(trace.x), y: unpack(trace.y)});
+        if (trace.marker) {
+            copy.marker = Object.assign({}, trace.marker, {color: unpack(trace.marker.color)});
+        }
+        return copy;
+    });
+    return {data: data, layout: packed.figure.layout};
+}
+'''
@@ -0,0 +1,76 @@
+"""
+    BTC_Resample:
+        - Picks the heat map markers by date instead of by row position: every day is put in a calendar bucket
+          (fixed length like 28 days / 4 weeks from an anchor date, or calendar months) and one day per bucket is
+          used as its marker, so gaps or duplicate days in the BCHAIN data only affect their own bucket.
+        - Buckets are numbered with numpy (days since the anchor // bucket length, or year * 12 + month) and split
+          where the number changes, a vectorized group by over the sorted dates.
+        - BucketResampler keeps the markers between refreshes, when new days arrive only the latest bucket
+          (and any bucket after it) is recomputed instead of the whole marker series.
+"""
+import numpy as np
+import pandas as pd
+
+# heat map bucket: a fixed length pandas offset ('28D', '4W') or 'M' for calendar months.
+HEATMAP_BUCKET = '28D'
+# start of the first fixed length bucket, a date or 'start' (first day of the data), ignored for calendar months.
+HEATMAP_ANCHOR = 'start'
+
+
+class BucketResampler:
+    def __init__(self, freq=HEATMAP_BUCKET, anchor=HEATMAP_ANCHOR, how='first'):
+        """Instantiating resampler of freq buckets from anchor, using the first (or last) day of a bucket as marker."""
+        if how not in ('first', 'last'):
+            raise ValueError('how must be first or last, not {!r}'.format(how))
+        self.freq = freq
+        self.anchor = anchor
+        self.how = how
+        # bucket length in days, None for calendar months.
+        self.days = None if freq == 'M' else pd.Timedelta(freq).days
+        if self.days is not None and (self.days < 1 or pd.Timedelta(freq) != pd.Timedelta(days=self.days)):
+            raise ValueError('bucket must be a whole number of days, not {!r}'.format(freq))
+        # dates the markers were computed for and the marker positions in them.
+        self.dates = None
+        self.rows = np.empty(0, dtype=np.int64)
+
+    def buckets(self, dates, first):
+        """Returns bucket number of every date (datetime64 array), first being the first day of the data."""
+        if self.days is None:
+            return dates.astype('datetime64[M]').astype(np.int64)
+        anchor = first if self.anchor == 'start' else np.datetime64(self.anchor)
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        return (days - np.datetime64(anchor, 'D').astype(np.int64)) // self.days
+
+    def markers(self, dates, start=0):
+        """Returns positions of the marker day of every bucket in dates[start:] (dates sorted ascending)."""
+        buckets = self.buckets(dates[start:], dates[0]) if len(dates) else dates
+        if len(buckets) == 0:
+            return np.empty(0, dtype=np.int64)
+        changes = np.flatnonzero(buckets[1:] != buckets[:-1]) + 1
+        if self.how == 'first':
+            return start + np.r_[0, changes]
+        return start + np.r_[changes - 1, len(buckets) - 1]
+
+    def update(self, dates):
+        """
+            Returns marker positions for dates. If dates extend the dates of the last call (same days, new days
+            appended) only the rows from the start of the latest bucket on are resampled.
+        """
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        previous = self.dates
+        start = None
+        if previous is not None and len(previous) and len(self.rows) and len(dates) >= len(previous):
+            # first day of the latest bucket, the markers before it can not change.
+            first = self.rows[-1] if self.how == 'first' else (self.rows[-2] + 1 if len(self.rows) > 1 else 0)
+            if dates[0] == previous[0] and dates[first] == previous[first] and dates[len(previous) - 1] == previous[-1]:
+                start = first
+        if start is None:
+            rows = self.markers(dates)
+        else:
+            kept = self.rows[self.rows < start]
+            # the anchor stays dates[0], so the tail gets the same bucket numbers as in the full series.
+            rows = np.concatenate([kept, self.markers(dates, start)])
+        # new arrays each time, the rows handed out to earlier snapshots are never changed.
+        self.dates = dates
+        self.rows = rows
+        return rows
@@ -0,0 +1,115 @@
+"""
+    BTC_Shared:
+        - Shares the price history and indicator columns between the processes of a multi-worker server.
+        - A single loader process (python BTC_Shared.py) refreshes the price store, the indicators and the CoinGecko
+          quotes and writes them to one numpy file, workers never fetch or compute anything themselves.
+        - The file is written under a temporary name and moved in place, so a worker never reads a half written file.
+        - Workers map the file read only (np.load with mmap_mode='r'), all of them share the same pages of the OS
+          page cache, so startup time and memory stay flat as workers are added.
+        - The file holds one record whose fields are whole columns, every column is one contiguous block of the file,
+          so the data frames use the mapped arrays as they are (no copy per worker).
+        - A worker still mapping a replaced file keeps reading the old version until it loads the new one.
+        - Other coins get their own file next to it (shared.eth.npy, ...), written before the BTC one.
+"""
+import os
+import json
+import time
+import traceback
+import numpy as np
+from BTC_Price_Store import STORE_DIR
+from BTC_Ingest import Ingestor
+from BTC_Assets import ASSET_COUNT
+
+# default path of the shared file (CoinGecko quotes are written next to it as .json).
+SHARED_FILE = os.path.join(STORE_DIR, 'shared.npy')
+# last known good data written by a single process server, used to warm start the next one.
+SNAPSHOT_FILE = os.path.join(STORE_DIR, 'snapshot.npy')
+# seconds between loader refreshes.
+LOADER_INTERVAL = 60 * 60
+# seconds between quote only refreshes of the loader, for the live ticker.
+QUOTE_INTERVAL = 60
+
+
+def assetPath(path, symbol):
+    """Returns path of the shared file of coin symbol, path itself for btc."""
+    return path if symbol == 'btc' else path[:-len('.npy')] + '.' + symbol + '.npy'
+
+
+def writeShared(assets, quotes, path=SHARED_FILE):
+    """Writes assets ({symbol: columns}, btc included) and quotes (CoinGecko markets list) next to path."""
+    for symbol, columns in assets.items():
+        if symbol != 'btc':
+            writeTable(columns, assetPath(path, symbol))
+    # quotes next, the btc table being replaced is what tells workers a new version is there.
+    writeQuotes(quotes, path)
+    writeTable(assets['btc'], path)
+
+
+def writeTable(columns, path):
+    """Writes columns (dict of equal length arrays) to path, column after column."""
+    rows = len(columns['Date'])
+    # dates are stored in nanoseconds, the resolution pandas uses, so workers can use them without converting.
+    dtype = [('Date', 'datetime64[ns]', (rows,))] + [(column, np.float64, (rows,)) for column in columns if column != 'Date']
+    # a single record, each field (column) is rows contiguous values instead of one value strided across records.
+    table = np.empty((), dtype=dtype)
+    for column in columns:
+        table[column] = columns[column]
+    # np.save adds .npy to names without it, so the temporary file keeps the extension.
+    tmp = path[:-len('.npy')] + '.tmp.npy'
+    np.save(tmp, table)
+    os.replace(tmp, path)
+
+
+def writeQuotes(quotes, path=SHARED_FILE):
+    """Writes quotes (CoinGecko markets list) next to the shared file at path."""
+    with open(path + '.json.tmp', 'w') as f:
+        json.dump(quotes, f)
+    os.replace(path + '.json.tmp', path + '.json')
+
+
+def readQuotes(path=SHARED_FILE):
+    """Returns the quotes written next to the shared file at path."""
+    with open(path + '.json') as f:
+        return json.load(f)
+
+
+def readTable(path):
+    """Returns {column: read only contiguous array mapped from path}."""
+    table = np.load(path, mmap_mode='r')
+    return {column: table[column] for column in table.dtype.names}
+
+
+def readShared(path=SHARED_FILE):
+    """Returns ({symbol: {column: read only array}} of btc and every top coin written next to path, quotes)."""
+    assets = {'btc': readTable(path)}
+    quotes = readQuotes(path)
+    for quote in quotes[:ASSET_COUNT]:
+        symbol = quote['symbol'].lower()
+        if symbol not in assets and os.path.exists(assetPath(path, symbol)):
+            assets[symbol] = readTable(assetPath(path, symbol))
+    return assets, quotes
+
+
+def runLoader(path=SHARED_FILE, interval=LOADER_INTERVAL, quote_interval=QUOTE_INTERVAL):
+    """
+        Loader process loop, refreshing the data and writing the shared file every interval seconds.
+        Quotes alone are refreshed every quote_interval seconds in between.
+    """
+    ingestor = Ingestor()
+    # time of the last full refresh, None until one succeeds.
+    loaded = None
+    while True:
+        try:
+            if loaded is None or time.time() - loaded >= interval:
+                writeShared(*ingestor.load(), path)
+                loaded = time.time()
+            else:
+                writeQuotes(ingestor.fetchQuotes(), path)
+        except Exception:
+            # workers keep serving the last written file, trying again next time.
+            traceback.print_exc()
+        time.sleep(min(interval, quote_interval))
+
+
+if __name__ == '__main__':
+    runLoader(os.environ.get('BTC_SHARED_FILE', SHARED_FILE))
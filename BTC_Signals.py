@@ -0,0 +1,200 @@
+"""
+    BTC_Signals:
+        - Turns the heat map colors and golden ratio bands into buy/sell signals and backtests them over all of history.
+        - Every day is classified into a heat map color bucket (% change of the 200WMA over the heat map bucket, cut at
+          COLOR_EDGES like the chart's 0 - 20 % color scale) and a band level (number of 350DMA multiplier bands the
+          price is above), band crossings being the days that level changes.
+        - Strategy: long from a day with a color bucket at or below buy_bucket, flat again once the color reaches
+          sell_bucket or the price is above the sell_multiplier band (sell wins). Signals are taken at a day's close.
+        - Sweeps run every combination of a parameter grid (window lengths, bucket thresholds, multipliers):
+            - moving averages are computed once per window with cumulative sums,
+            - configurations sharing the same windows are backtested together, one row each of a 2-D numpy array,
+            - groups of windows run in a process pool when there are many configurations.
+        - Results are memoized per parameter set (one SignalEngine per coin and data version, see engineFor), a repeated
+          or overlapping sweep only runs the configurations it has not seen.
+"""
+import os
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from BTC_Pipeline import Bitcoin
+from BTC_Metrics import metrics
+
+# 200WMA % changes where the heat map color changes (the chart's color scale runs from 0 to 20 %).
+COLOR_EDGES = np.arange(0.0, 20.1, 2.5)
+# parameters of a configuration in this order, defaulting to what the charts show.
+PARAMETERS = ('wma_window', 'bucket', 'dma_window', 'buy_bucket', 'sell_bucket', 'sell_multiplier')
+DEFAULTS = {'wma_window': 1400, 'bucket': 28, 'dma_window': 350, 'buy_bucket': 1, 'sell_bucket': 9, 'sell_multiplier': 3.0}
+# grid swept by the batch mode (1728 configurations).
+GRID = {
+    'wma_window': [700, 1050, 1400],
+    'bucket': [14, 28, 56],
+    'dma_window': [200, 350, 500],
+    'buy_bucket': [0, 1, 2, 3],
+    'sell_bucket': [6, 7, 8, 9],
+    'sell_multiplier': [2.0, 3.0, 5.0, 8.0],
+}
+METRICS = ('total_return', 'cagr', 'max_drawdown', 'trades', 'exposure')
+# configurations backtested in one 2-D array (bounds memory), and new configurations from which a process pool is used
+# (below the 1728 of GRID, a full sweep runs in the pool).
+CHUNK = 512
+PARALLEL_CONFIGS = 1000
+
+
+def rollingMean(values, window):
+    """Returns mean of the window values ending at every position, NaN before the first full window."""
+    sums = np.cumsum(np.r_[0.0, values])
+    mean = np.full(len(values), np.nan)
+    if len(values) >= window:
+        mean[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return mean
+
+
+def features(prices, wma_window, bucket, dma_window):
+    """Returns (color bucket, moving average of days with a price above 0, valid day mask) of every day."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wma = rollingMean(prices, wma_window)
+        change = np.full(len(prices), np.nan)
+        change[bucket:] = (wma[bucket:] / wma[:-bucket] - 1) * 100
+    positive = prices > 0
+    dma = np.full(len(prices), np.nan)
+    dma[positive] = rollingMean(prices[positive], dma_window)
+    valid = np.isfinite(change) & np.isfinite(dma) & positive
+    return np.digitize(change, COLOR_EDGES), dma, valid
+
+
+def backtest(prices, signals, valid):
+    """
+        Backtests signals ((configurations, days) array of 1 buy, -1 sell, 0 none) on prices, from the first valid day.
+        Returns {metric: array with one value per configuration}.
+    """
+    start = np.argmax(valid)
+    signals = signals[:, start:]
+    days = signals.shape[1]
+    # each day holds the last signal so far: long after a buy, flat after a sell or before any signal.
+    last = np.maximum.accumulate(np.where(signals != 0, np.arange(days), 0), axis=1)
+    position = np.take_along_axis(signals, last, axis=1) == 1
+    # log return from one close to the next, earned when long at the first close.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.nan_to_num(np.diff(np.log(prices[start:])), nan=0.0, posinf=0.0, neginf=0.0)
+    equity = np.zeros((len(signals), days))
+    np.cumsum(position[:, :-1] * returns, axis=1, out=equity[:, 1:])
+    total = np.expm1(equity[:, -1])
+    years = max(days - 1, 1) / 365
+    return {
+        'total_return': total,
+        'cagr': np.power(1 + total, 1 / years) - 1,
+        # largest fall from a previous high of the equity curve.
+        'max_drawdown': -np.expm1(-(np.maximum.accumulate(equity, axis=1) - equity).max(axis=1)),
+        'trades': position[:, 0] + (np.diff(position.astype(np.int8), axis=1) == 1).sum(axis=1),
+        'exposure': position.mean(axis=1),
+    }
+
+
+def signalArray(prices, colors, dma, valid, rules):
+    """Returns (configurations, days) int8 signals of rules ((configurations, 3) array of buy_bucket, sell_bucket, sell_multiplier)."""
+    buy = colors <= rules[:, 0:1]
+    sell = (colors >= rules[:, 1:2]) | (prices > dma * rules[:, 2:3])
+    signals = np.where(sell, -1, np.where(buy, 1, 0)).astype(np.int8)
+    signals[:, ~valid] = 0
+    return signals
+
+
+def runGroup(prices, windows, rules, feature=None):
+    """Backtests every row of rules with windows (wma_window, bucket, dma_window). Returns {metric: array}."""
+    colors, dma, valid = feature if feature is not None else features(prices, *windows)
+    results = {metric: [] for metric in METRICS}
+    if not valid.any():
+        return {metric: np.full(len(rules), np.nan) for metric in METRICS}
+    for chunk in range(0, len(rules), CHUNK):
+        signals = signalArray(prices, colors, dma, valid, rules[chunk:chunk + CHUNK])
+        for metric, values in backtest(prices, signals, valid).items():
+            results[metric].append(values)
+    return {metric: np.concatenate(values) for metric, values in results.items()}
+
+
+class SignalEngine:
+    def __init__(self, dates, prices):
+        """Instantiating engine for daily dates and prices (equal length arrays, ascending dates)."""
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.prices = np.asarray(prices, dtype=np.float64)
+        # (wma_window, bucket, dma_window) -> features(), and parameter tuple -> {metric: value}.
+        self.features = {}
+        self.results = {}
+
+    def feature(self, wma_window, bucket, dma_window):
+        """Returns (and memoizes) the features of one set of windows."""
+        key = (wma_window, bucket, dma_window)
+        if key not in self.features:
+            self.features[key] = features(self.prices, *key)
+        return self.features[key]
+
+    def classify(self, **params):
+        """
+            Returns one row per day: Date, Value, Color (heat map bucket), Band (multiplier bands the price is above),
+            Crossing (1 band crossed up, -1 down, 0 none) and Signal (1 buy, -1 sell, 0 none), for params (see DEFAULTS).
+        """
+        params = {**DEFAULTS, **params}
+        colors, dma, valid = self.feature(params['wma_window'], params['bucket'], params['dma_window'])
+        bands = (self.prices[:, None] > dma[:, None] * Bitcoin.GR_multipliers).sum(axis=1)
+        rules = np.array([[params['buy_bucket'], params['sell_bucket'], params['sell_multiplier']]], dtype=np.float64)
+        # a crossing needs the day before to be valid too, the first valid day has nothing to compare with.
+        crossing = np.zeros(len(bands), dtype=np.int64)
+        both = valid[1:] & valid[:-1]
+        crossing[1:][both] = np.sign(np.diff(bands))[both]
+        return pd.DataFrame({
+            'Date': self.dates,
+            'Value': self.prices,
+            'Color': np.where(valid, colors, -1),
+            'Band': np.where(valid, bands, -1),
+            'Crossing': crossing,
+            'Signal': signalArray(self.prices, colors, dma, valid, rules)[0],
+        })
+
+    def sweep(self, grid=GRID, workers=None):
+        """
+            Backtests every combination of grid ({parameter: list of values}, missing ones at DEFAULTS), only running
+            combinations not memoized yet. workers is the process pool size (cpu count if None, 1 for no pool).
+            Returns one row per combination: the parameters and METRICS.
+        """
+        values = [list(grid.get(parameter, [DEFAULTS[parameter]])) for parameter in PARAMETERS]
+        configs = list(itertools.product(*values))
+        # new configurations grouped by their windows, the features of a group are computed once.
+        groups = {}
+        for config in configs:
+            if config not in self.results:
+                groups.setdefault(config[:3], []).append(config)
+        metrics.count('signal_configs', len(configs) - sum(map(len, groups.values())), result='hit')
+        metrics.count('signal_configs', sum(map(len, groups.values())), result='miss')
+        with metrics.timer('signal_sweep'):
+            rules = {windows: np.array([config[3:] for config in group], dtype=np.float64) for windows, group in groups.items()}
+            workers = workers or os.cpu_count() or 1
+            if workers > 1 and len(groups) > 1 and sum(map(len, groups.values())) >= PARALLEL_CONFIGS:
+                # forked, a spawned worker would import the module that started the sweep again.
+                with ProcessPoolExecutor(min(workers, len(groups)), mp_context=multiprocessing.get_context('fork')) as pool:
+                    futures = {windows: pool.submit(runGroup, self.prices, windows, rules[windows]) for windows in groups}
+                    outcomes = {windows: future.result() for windows, future in futures.items()}
+            else:
+                outcomes = {windows: runGroup(self.prices, windows, rules[windows], self.feature(*windows)) for windows in groups}
+            for windows, group in groups.items():
+                for row, config in enumerate(group):
+                    self.results[config] = {metric: outcomes[windows][metric][row].item() for metric in METRICS}
+        table = pd.DataFrame(configs, columns=PARAMETERS)
+        for metric in METRICS:
+            table[metric] = [self.results[config][metric] for config in configs]
+        return table
+
+
+# symbol -> (data version, SignalEngine), results stay memoized while the data of the coin does not change.
+ENGINES = {}
+
+
+def engineFor(btc_obj):
+    """Returns the SignalEngine of a Bitcoin instance, shared by every instance with the same coin and data version."""
+    version, engine = ENGINES.get(btc_obj.symbol, (None, None))
+    if version != btc_obj.version:
+        engine = SignalEngine(btc_obj.complete_dates, btc_obj.complete_df['Value'])
+        ENGINES[btc_obj.symbol] = (btc_obj.version, engine)
+    return engine
@@ -0,0 +1,73 @@
+"""
+    test_BTC_Candles:
+        - Minute ticks streamed in batches through IntradayEngine give the daily and weekly closes of pandas resample(),
+          also when the engine is reopened from disk partway through.
+        - Replaying ticks (a restart before or after the state was saved) never appends a day or a week twice.
+"""
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from BTC_Price_Store import PriceStore
+from BTC_Indicators import IndicatorEngine
+from BTC_Candles import IntradayEngine
+
+DAYS = 120
+BATCH = 7000
+
+
+def ticks(days=DAYS, seed=0):
+    """Returns (times, prices) of a random walk with one tick a minute, starting on a Wednesday."""
+    rng = np.random.default_rng(seed)
+    minutes = days * 24 * 60
+    times = np.datetime64('2020-01-01', 'ns') + np.arange(minutes) * np.timedelta64(60, 's')
+    prices = 1000 * np.exp(np.cumsum(rng.normal(0, 1e-3, minutes)))
+    return times, prices
+
+
+def openEngine(directory):
+    """Returns an IntradayEngine over the store in directory, restoring any saved state."""
+    return IntradayEngine(IndicatorEngine(PriceStore(None, str(directory))))
+
+
+def test_stream_matches_resample(tmp_path):
+    times, prices = ticks()
+    engine = openEngine(tmp_path)
+    for start in range(0, len(times), BATCH):
+        # reopened halfway, the open bars and weekly state come back from disk.
+        if start == BATCH * (len(times) // BATCH // 2):
+            engine = openEngine(tmp_path)
+        engine.ingest(times[start:start + BATCH], prices[start:start + BATCH])
+    series = pd.Series(prices, index=times)
+    # every day but the last (still open) is committed.
+    daily = series.resample('D').last()
+    dates, values = engine.store.read()
+    assert np.array_equal(dates, daily.index.values[:-1].astype('datetime64[D]'))
+    assert np.array_equal(values, daily.to_numpy()[:-1])
+    weekly = series.resample('W-MON', label='left', closed='left').last()
+    assert [week[0] for week in engine.weeks] == [str(date.date()) for date in weekly.index[:-1]]
+    assert np.array_equal([week[1] for week in engine.weeks], weekly.to_numpy()[:-1])
+
+
+def test_replay_is_skipped(tmp_path):
+    times, prices = ticks()
+    engine = openEngine(tmp_path)
+    half = len(times) // 2
+    engine.ingest(times[:half], prices[:half])
+    saved = str(tmp_path / 'saved.json')
+    shutil.copy(engine.path, saved)
+    engine.ingest(times[half:], prices[half:])
+    rows, weeks = len(engine.store), len(engine.weeks)
+    # the same ticks again after a clean restart.
+    engine = openEngine(tmp_path)
+    engine.ingest(times[half:], prices[half:])
+    assert (len(engine.store), len(engine.weeks)) == (rows, weeks)
+    # a crash after the days were appended but before the open bars and weeks were saved: replaying from the
+    # saved state catches the weeks up, the days already stored are not appended again.
+    os.replace(saved, engine.path)
+    engine = openEngine(tmp_path)
+    assert len(engine.weeks) < weeks
+    assert engine.ingest(times[half:], prices[half:]) == 0
+    assert (len(engine.store), len(engine.weeks)) == (rows, weeks)
+    expected = pd.Series(prices, index=times).resample('D').last().to_numpy()[:-1]
+    assert np.array_equal(engine.store.read()[1], expected)
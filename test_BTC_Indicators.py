@@ -0,0 +1,52 @@
+"""
+    test_BTC_Indicators:
+        - The incremental 200WMA and 350DMA must stay bit for bit identical to pandas rolling().mean(),
+          RollingMean mirrors pandas' private roll_mean arithmetic and would drift silently after a pandas upgrade.
+"""
+import numpy as np
+import pandas as pd
+from BTC_Price_Store import PriceStore
+from BTC_Indicators import IndicatorEngine
+
+
+def history(days=3000, seed=0):
+    """Returns (dates, values) of a random walk price history, zero first days and a flat run like the real data."""
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64('2009-01-03') + np.arange(days)
+    values = np.round(np.exp(np.cumsum(rng.normal(0.003, 0.04, days))), 2)
+    values[:300] = 0
+    values[1000:1500] = values[1000]
+    return dates, values
+
+
+def pandasIndicators(values):
+    """Returns {column: array} computed the way the charts did before the incremental engine."""
+    series = pd.Series(values)
+    positive = series[series > 0]
+    return {
+        '200WMA': series.rolling(1400).mean().to_numpy(),
+        '350DMA': positive.rolling(350).mean().reindex(series.index).to_numpy(),
+    }
+
+
+def test_full_load(tmp_path):
+    dates, values = history()
+    store = PriceStore(None, str(tmp_path))
+    store.append(dates, values)
+    indicators = IndicatorEngine(store)
+    assert indicators.update() == len(values)
+    expected = pandasIndicators(values)
+    for column, values in indicators.read().items():
+        assert np.array_equal(values, expected[column], equal_nan=True), column
+
+
+def test_chunked_load(tmp_path):
+    dates, values = history()
+    store = PriceStore(None, str(tmp_path))
+    # uneven chunks, the window state is saved and reopened from disk between them.
+    for start, end in zip([0, 1, 299, 1390, 1401, 2000, 2999], [1, 299, 1390, 1401, 2000, 2999, 3000]):
+        store.append(dates[start:end], values[start:end])
+        IndicatorEngine(store).update()
+    expected = pandasIndicators(values)
+    for column, values in IndicatorEngine(store).read().items():
+        assert np.array_equal(values, expected[column], equal_nan=True), column
@@ -0,0 +1,94 @@
+"""
+    test_BTC_Ingest:
+        - Runs the Ingestor against a local stub HTTP server standing in for BCHAIN/Quandl and CoinGecko.
+        - Each source falls back on its own to cached data when it fails.
+"""
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import pytest
+from pycoingecko import CoinGeckoAPI
+from BTC_Price_Store import PriceStore
+from BTC_Assets import AssetSet
+from BTC_Ingest import Ingestor
+
+DAYS = 500
+QUOTES = [
+    {'id': 'bitcoin', 'symbol': 'btc', 'current_price': 50000.0, 'price_change_percentage_24h': -1.0},
+    {'id': 'ethereum', 'symbol': 'eth', 'current_price': 3000.0, 'price_change_percentage_24h': 2.0},
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # path prefixes answered 404 (a failing source).
+    failing = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if any(self.path.startswith(prefix) for prefix in self.failing):
+            return self.reply(404, {})
+        if self.path.startswith('/quandl'):
+            dates = np.datetime64('2015-01-01') + np.arange(DAYS)
+            data = [[str(date), 100.0 + k] for k, date in enumerate(dates)]
+            return self.reply(200, {'dataset': {'column_names': ['Date', 'Value'], 'data': data[::-1]}})
+        if self.path.startswith('/api/v3/coins/markets'):
+            return self.reply(200, QUOTES)
+        if self.path.startswith('/api/v3/coins/ethereum/market_chart'):
+            start = np.datetime64('2016-01-01', 'ms').astype(np.int64)
+            return self.reply(200, {'prices': [[int(start + k * 86400000), 10.0 + k] for k in range(DAYS)]})
+        self.reply(404, {})
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubHandler.failing = set()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+
+
+def stubIngestor(url, directory):
+    """Returns an Ingestor whose sources and stores all point at the stub server and directory."""
+    cg = CoinGeckoAPI()
+    cg.api_base_url = url + '/api/v3/'
+    store = PriceStore(url + '/quandl', str(directory / 'btc'))
+    return Ingestor(store=store, cg=cg, assets=AssetSet(cg, str(directory / 'assets'), count=2))
+
+
+def test_load(stub, tmp_path):
+    assets, quotes = stubIngestor(stub, tmp_path).load()
+    assert quotes == QUOTES
+    assert sorted(assets) == ['btc', 'eth']
+    assert len(assets['btc']['Value']) == DAYS
+    assert len(assets['eth']['Value']) == DAYS
+    assert set(assets['btc']) == {'Date', 'Value', '200WMA', '350DMA'}
+
+
+def test_fallback(stub, tmp_path):
+    ingestor = stubIngestor(stub, tmp_path)
+    ingestor.load()
+    # every source down: the stored histories and the last good quotes are used.
+    StubHandler.failing = {'/quandl', '/api/v3/coins'}
+    assets, quotes = ingestor.load()
+    assert quotes == QUOTES
+    assert len(assets['btc']['Value']) == DAYS
+    assert len(assets['eth']['Value']) == DAYS
+
+
+def test_no_history(stub, tmp_path):
+    StubHandler.failing = {'/quandl'}
+    with pytest.raises(RuntimeError):
+        stubIngestor(stub, tmp_path).load()
@@ -0,0 +1,57 @@
+"""
+    test_BTC_Price_Store:
+        - The store runs offline from a local json fixture in the BCHAIN/Quandl layout, a refresh only appends
+          rows newer than the last stored date.
+"""
+import json
+import numpy as np
+from BTC_Price_Store import PriceStore
+
+
+def writeFixture(path, dates, values):
+    """Writes (dates, values) to path as a BCHAIN/Quandl json dataset, newest first like the API."""
+    data = [[str(date), float(value)] for date, value in zip(dates[::-1], values[::-1])]
+    with open(path, 'w') as f:
+        json.dump({'dataset': {'column_names': ['Date', 'Value'], 'data': data}}, f)
+
+
+def test_refresh_appends_new_rows(tmp_path):
+    dates = np.datetime64('2009-01-03') + np.arange(100)
+    values = np.arange(100) * 1.5
+    fixture = str(tmp_path / 'history.json')
+    writeFixture(fixture, dates[:60], values[:60])
+    store = PriceStore(fixture, str(tmp_path / 'store'))
+    assert store.refresh() == 60
+    assert store.refresh() == 0
+    # the source grows by 40 days, only those are appended (to a reopened store).
+    writeFixture(fixture, dates, values)
+    store = PriceStore(fixture, str(tmp_path / 'store'))
+    assert store.lastDate() == dates[59]
+    assert store.refresh() == 40
+    stored_dates, stored_values = store.read()
+    assert np.array_equal(stored_dates, dates)
+    assert np.array_equal(stored_values, values)
+
+
+def test_partial_row_is_dropped(tmp_path):
+    store = PriceStore(None, str(tmp_path))
+    dates = np.datetime64('2020-01-01') + np.arange(3)
+    store.append(dates, [1.0, 2.0, 3.0])
+    # an interrupted append wrote a value without its date.
+    with open(store.path('Value'), 'ab') as f:
+        f.write(np.float64(4.0).tobytes())
+    assert len(store) == 3
+    store.append(dates[-1:] + 1, [5.0])
+    assert np.array_equal(store.read()[1], [1.0, 2.0, 3.0, 5.0])
+
+
+def test_repeated_append_is_skipped(tmp_path):
+    store = PriceStore(None, str(tmp_path))
+    dates = np.datetime64('2020-01-01') + np.arange(5)
+    assert store.append(dates[:3], [1.0, 2.0, 3.0]) == 3
+    # a second writer appending days it fetched before the first one finished: only the newer ones are kept.
+    assert store.append(dates[:3], [1.0, 2.0, 3.0]) == 0
+    assert store.append(dates[1:], [2.0, 3.0, 4.0, 5.0]) == 2
+    stored_dates, stored_values = store.read()
+    assert np.array_equal(stored_dates, dates)
+    assert np.array_equal(stored_values, [1.0, 2.0, 3.0, 4.0, 5.0])
@@ -0,0 +1,48 @@
+"""
+    test_BTC_Resample:
+        - BucketResampler.update() on a date series growing between refreshes (with missing days) must give the same
+          markers as markers() on the whole series, for fixed length and calendar month buckets.
+        - Markers pick the same day of each bucket as pandas resample().
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from BTC_Resample import BucketResampler
+
+
+def gappedDates(days=2000, seed=0):
+    """Returns ascending datetime64[ns] days with about 5 % of days and a whole month missing."""
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64('2014-12-20', 'ns') + np.arange(days) * np.timedelta64(1, 'D')
+    keep = rng.random(days) > 0.05
+    keep[400:431] = False
+    return dates[keep]
+
+
+@pytest.mark.parametrize('anchor', ['start', '2015-01-05'])
+@pytest.mark.parametrize('how', ['first', 'last'])
+@pytest.mark.parametrize('freq', ['28D', '4W', 'M'])
+def test_update_matches_markers(freq, how, anchor):
+    dates = gappedDates()
+    resampler = BucketResampler(freq, anchor, how)
+    rng = np.random.default_rng(1)
+    # growing by one day, a few days and a few buckets at a time, like daily refreshes after downtime.
+    ends = np.cumsum(rng.choice([1, 2, 5, 27, 28, 60], size=len(dates)))
+    for end in ends[ends <= len(dates)]:
+        prefix = dates[:end]
+        assert np.array_equal(resampler.update(prefix), resampler.markers(prefix)), end
+    # a revised history (not an extension of the last one) is resampled from scratch.
+    revised = np.delete(dates, [5, 500])
+    assert np.array_equal(resampler.update(revised), resampler.markers(revised))
+
+
+@pytest.mark.parametrize('how', ['first', 'last'])
+@pytest.mark.parametrize('freq, rule, origin', [('28D', '28D', 'start'), ('4W', '28D', '2015-01-05'), ('M', 'MS', None)])
+def test_markers_match_pandas(freq, rule, origin, how):
+    dates = gappedDates()
+    rows = BucketResampler(freq, origin or 'start', how).markers(dates)
+    series = pd.Series(dates, index=dates)
+    # calendar months have no origin, fixed length buckets start at the first day or the anchor date.
+    kwargs = {} if origin is None else {'origin': origin if origin == 'start' else pd.Timestamp(origin)}
+    expected = getattr(series.resample(rule, **kwargs), how)().dropna()
+    assert np.array_equal(dates[rows], expected.to_numpy())
@@ -0,0 +1,73 @@
+"""
+    test_BTC_Signals:
+        - A sweep only backtests configurations it has not memoized, the pool gives the same table as one process.
+        - Band crossings are only counted between two valid days, never from the days before the averages exist.
+"""
+import numpy as np
+import pandas as pd
+import BTC_Signals
+from BTC_Signals import SignalEngine, GRID, PARALLEL_CONFIGS
+from BTC_Pipeline import Bitcoin
+from test_BTC_Indicators import history
+
+SMALL_GRID = {'wma_window': [700, 1400], 'bucket': [28], 'dma_window': [350], 'buy_bucket': [0, 1], 'sell_multiplier': [3.0, 5.0]}
+
+
+def engine():
+    """Returns a SignalEngine over the random walk history of test_BTC_Indicators."""
+    dates, values = history()
+    return SignalEngine(dates, values)
+
+
+def countingRuns(monkeypatch):
+    """Replaces runGroup with a wrapper recording the number of configurations backtested. Returns the record list."""
+    runs = []
+    run_group = BTC_Signals.runGroup
+
+    def counting(prices, windows, rules, feature=None):
+        runs.append(len(rules))
+        return run_group(prices, windows, rules, feature)
+    monkeypatch.setattr(BTC_Signals, 'runGroup', counting)
+    return runs
+
+
+def test_sweep_memoized(monkeypatch):
+    signals = engine()
+    runs = countingRuns(monkeypatch)
+    table = signals.sweep(SMALL_GRID, workers=1)
+    assert len(table) == 8 and sum(runs) == 8
+    # the same grid again is answered from the memo.
+    assert signals.sweep(SMALL_GRID, workers=1).equals(table)
+    assert sum(runs) == 8
+    # an overlapping grid only backtests its new configurations.
+    wider = signals.sweep({**SMALL_GRID, 'sell_multiplier': [3.0, 5.0, 8.0]}, workers=1)
+    assert len(wider) == 12 and sum(runs) == 12
+    assert wider[wider['sell_multiplier'] != 8.0].reset_index(drop=True).equals(table)
+
+
+def test_sweep_pool_matches_serial(monkeypatch):
+    # the default grid is large enough for the pool.
+    assert np.prod([len(values) for values in GRID.values()]) >= PARALLEL_CONFIGS
+    monkeypatch.setattr(BTC_Signals, 'PARALLEL_CONFIGS', 1)
+    serial = engine().sweep(SMALL_GRID, workers=1)
+    pooled = engine().sweep(SMALL_GRID, workers=2)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+
+def test_classify_crossings():
+    dates, values = history()
+    days = SignalEngine(dates, values).classify()
+    valid = days['Band'].to_numpy() >= 0
+    assert valid.any() and not valid.all()
+    # bands counted against the 350DMA of the days with a price, like the golden ratio chart.
+    positive = pd.Series(values)[values > 0]
+    dma = positive.rolling(350).mean().reindex(range(len(values))).to_numpy()
+    bands = (values[:, None] > dma[:, None] * Bitcoin.GR_multipliers).sum(axis=1)
+    assert np.array_equal(days['Band'].to_numpy()[valid], bands[valid])
+    expected = np.zeros(len(values), dtype=np.int64)
+    both = valid[1:] & valid[:-1]
+    expected[1:][both] = np.sign(np.diff(bands))[both]
+    crossing = days['Crossing'].to_numpy()
+    assert np.array_equal(crossing, expected)
+    assert crossing[np.argmax(valid)] == 0
+    assert (crossing != 0).any()
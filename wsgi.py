@@ -0,0 +1,17 @@
+"""
+    wsgi:
+        - Production entry point for a multi-process WSGI server, e.g. gunicorn --workers 4 wsgi:server
+        - Start the loader process first (python BTC_Shared.py), it fetches and computes the data and writes the shared file.
+        - Every worker maps the loader's shared file read only instead of fetching and computing the data itself.
+        - Do not use gunicorn --preload, the refresher thread of each worker has to be started after the fork.
+"""
+import os
+from BTC_Shared import SHARED_FILE
+
+# switching BTC_Longterm_Data to multi-worker mode before it is imported.
+os.environ.setdefault('BTC_SHARED_FILE', SHARED_FILE)
+
+from BTC_Longterm_Data import app
+
+# WSGI application.
+server = app.server